@@ -0,0 +1,59 @@
+"""Reproducible benchmark datasets.
+
+Each dataset is one verified user, bench-<name>@example.com, owning a fixed
+number of contacts made by seed.py's generator and streamed in with COPY.
+Seeding is idempotent: a dataset whose user already has the expected number
+of contacts is left alone.
+"""
+
+from dataclasses import dataclass
+
+import asyncpg
+
+from seed import CONTACT_COLUMNS, contact_rows
+from src.services.auth import Hash
+
+DATASETS = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+PASSWORD = "bench-password"
+
+
+@dataclass
+class Dataset:
+    name: str
+    email: str
+    user_id: int
+    contacts: int
+    min_contact_id: int
+    max_contact_id: int
+
+
+async def seed_dataset(conn: asyncpg.Connection, name: str, seed: int = 42) -> Dataset:
+    count = DATASETS[name]
+    email = f"bench-{name}@example.com"
+    user_id = await conn.fetchval("SELECT id FROM users WHERE email = $1", email)
+    if user_id is None:
+        user_id = await conn.fetchval(
+            "INSERT INTO users (email, password_hash, created_at, email_verified) "
+            "VALUES ($1, $2, now(), true) RETURNING id",
+            email,
+            await Hash().get_password_hash(PASSWORD),
+        )
+    existing = await conn.fetchval(
+        "SELECT count(*) FROM contacts WHERE user_id = $1", user_id
+    )
+    if existing != count:
+        async with conn.transaction():
+            await conn.execute("DELETE FROM contacts WHERE user_id = $1", user_id)
+            await conn.copy_records_to_table(
+                "contacts",
+                records=contact_rows(user_id, 0, count, f"{seed}:{name}", upcoming=20),
+                columns=CONTACT_COLUMNS,
+            )
+            await conn.execute(
+                "UPDATE users SET contacts_count = $1 WHERE id = $2", count, user_id
+            )
+        await conn.execute("ANALYZE contacts")
+    low, high = await conn.fetchrow(
+        "SELECT min(id), max(id) FROM contacts WHERE user_id = $1", user_id
+    )
+    return Dataset(name, email, user_id, count, low, high)
@@ -0,0 +1,127 @@
+"""Serialization benchmark for contact list responses.
+
+Serves the same page of Contact ORM objects from two endpoints in one app:
+one through `response_model=List[ContactShortResponse]` (validation from
+attributes plus the stdlib JSON encoder), one through the trusted-rows path
+used when CONTACTS_LIST_RESPONSE is "fast". Requests go through the ASGI
+stack in-process, so no network or database is involved:
+
+    python benchmarks/list_serialization.py
+    python benchmarks/list_serialization.py --sizes 10 100 1000 --requests 200
+
+Exits with status 1 when the two endpoints return different JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.database.models import Contact  # noqa: E402
+from src.schemas import ContactShortResponse  # noqa: E402
+from src.services.serialization import FastJSONResponse, trusted_rows  # noqa: E402
+
+
+def make_contacts(count: int) -> List[Contact]:
+    start = datetime(2024, 1, 1)
+    return [
+        Contact(
+            id=i,
+            first_name=f"First{i}",
+            last_name=f"Last{i}",
+            email=f"contact{i}@example.com",
+            phone=f"+38050{i:07d}",
+            birthday=date(1990, 1, 1) + timedelta(days=i % 365),
+            additional_info="Met at the conference" if i % 3 else None,
+            created_at=start + timedelta(minutes=i),
+            updated_at=start + timedelta(minutes=i),
+            user_id=1,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def make_app(contacts: List[Contact]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/pydantic", response_model=List[ContactShortResponse])
+    async def pydantic_path():
+        return contacts
+
+    @app.get("/fast", response_model=List[ContactShortResponse])
+    async def fast_path():
+        return FastJSONResponse(trusted_rows(ContactShortResponse, contacts))
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int) -> float:
+    await client.get(path)  # warm up
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path)
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return statistics.median(timings) * 1000
+
+
+async def run(sizes: List[int], requests: int) -> tuple[list, bool]:
+    results = []
+    same = True
+    for size in sizes:
+        app = make_app(make_contacts(size))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            slow = (await client.get("/pydantic")).json()
+            fast = (await client.get("/fast")).json()
+            same = same and slow == fast
+            pydantic_ms = await measure(client, "/pydantic", requests)
+            fast_ms = await measure(client, "/fast", requests)
+        results.append(
+            {
+                "rows": size,
+                "pydantic_ms": round(pydantic_ms, 3),
+                "fast_ms": round(fast_ms, 3),
+                "speedup": round(pydantic_ms / fast_ms, 2),
+            }
+        )
+    return results, same
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results, same = asyncio.run(run(args.sizes, args.requests))
+    if args.json:
+        print(json.dumps({"results": results}, indent=2))
+    else:
+        print(f"median of {args.requests} requests")
+        print(f"{'rows':>6} {'pydantic ms':>12} {'fast ms':>9} {'speedup':>8}")
+        for r in results:
+            print(
+                f"{r['rows']:>6} {r['pydantic_ms']:>12.3f} {r['fast_ms']:>9.3f}"
+                f" {r['speedup']:>7.2f}x"
+            )
+    if not same:
+        print("responses differ between the two paths")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+"""End-to-end load benchmark for the API.
+
+Applies the migrations, seeds the requested datasets (see datasets.py),
+boots the app with uvicorn against DB_URL and drives a weighted request mix
+from a pool of concurrent httpx clients. Throughput and latency percentiles
+per route are printed and written as JSON, and compared with a stored
+baseline:
+
+    python benchmarks/load.py --dataset 1k 100k
+    python benchmarks/load.py --dataset 1m --duration 60 --concurrency 64
+    python benchmarks/load.py --mix list=5,get=5,create=1,delete=1
+    python benchmarks/load.py --update     # record a new baseline
+
+Settings are read like the app reads them (environment and .env). Rate
+limiting is switched off for the server under test. Exits with status 1 when
+any request fails, when load_baseline.json has no entry for a dataset, or
+when a dataset's RPS, or a busy route's RPS or p99 latency, regresses by
+more than --tolerance.
+Record the baseline on the machine that runs the comparison, with the same
+--concurrency, --duration and --workers.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, UTC
+from pathlib import Path
+
+import asyncpg
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.datasets import DATASETS, PASSWORD, Dataset, seed_dataset  # noqa: E402
+from seed import LAST_NAMES, asyncpg_dsn  # noqa: E402
+from src.conf.config import get_settings  # noqa: E402
+
+BASELINE = Path(__file__).with_name("load_baseline.json")
+DEFAULT_MIX = "signin=1,list=6,filter=3,birthdays=2,get=6,create=1,update=1,delete=1"
+# Routes with fewer requests are too noisy to compare on their own (their
+# p99 is the slowest request); they still count towards the dataset's RPS.
+MIN_SAMPLES = 100
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def add(self, route: str, seconds: float, ok: bool) -> None:
+        self.latencies[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            samples.sort()
+            routes[route] = {
+                "requests": len(samples),
+                "errors": self.errors[route],
+                "rps": round(len(samples) / elapsed, 1),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p90_ms": round(percentile(samples, 90) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+            }
+        total = sum(r["requests"] for r in routes.values())
+        return {
+            "requests": total,
+            "errors": sum(r["errors"] for r in routes.values()),
+            "rps": round(total / elapsed, 1),
+            "routes": routes,
+        }
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    index = max(0, math.ceil(pct / 100 * len(samples)) - 1)
+    return samples[index]
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        route, _, weight = part.partition("=")
+        if route not in ROUTES:
+            raise argparse.ArgumentTypeError(f"unknown route {route!r}")
+        mix[route] = int(weight or 1)
+    return mix
+
+
+class Session:
+    """One virtual user: a signed-in client working on one dataset."""
+
+    phones = itertools.count(int(time.time()) % 1_000_000 * 10)
+
+    def __init__(self, client: httpx.AsyncClient, dataset: Dataset, rng: random.Random):
+        self.client = client
+        self.dataset = dataset
+        self.rng = rng
+        self.headers: dict[str, str] = {}
+        self.created: list[int] = []
+
+    async def signin(self) -> httpx.Response:
+        response = await self.client.post(
+            "/api/auth/signin",
+            data={"username": self.dataset.email, "password": PASSWORD},
+        )
+        if response.status_code == 200:
+            token = response.json()["access_token"]
+            self.headers = {"Authorization": f"Bearer {token}"}
+        return response
+
+    def random_id(self) -> int:
+        return self.rng.randint(self.dataset.min_contact_id, self.dataset.max_contact_id)
+
+    async def list(self) -> httpx.Response:
+        pages = max(1, min(50, self.dataset.contacts // 20))
+        params = {"show": 20, "page": self.rng.randint(1, pages)}
+        return await self.client.get("/api/contacts", params=params, headers=self.headers)
+
+    async def filter(self) -> httpx.Response:
+        params = {"show": 20, "last_name": self.rng.choice(LAST_NAMES)[:4]}
+        return await self.client.get("/api/contacts", params=params, headers=self.headers)
+
+    async def birthdays(self) -> httpx.Response:
+        return await self.client.get(
+            "/api/contacts/birthdays/upcoming",
+            params={"days_ahead": 30, "show": 20},
+            headers=self.headers,
+        )
+
+    async def get(self) -> httpx.Response:
+        return await self.client.get(
+            f"/api/contacts/{self.random_id()}", headers=self.headers
+        )
+
+    async def create(self) -> httpx.Response:
+        n = next(self.phones) % 10_000_000
+        response = await self.client.post(
+            "/api/contacts",
+            json={
+                "first_name": "Bench",
+                "last_name": "Created",
+                "email": f"created.{n}@bench.example.com",
+                "phone": f"+38067{n:07d}",
+            },
+            headers=self.headers,
+        )
+        if response.status_code == 201:
+            self.created.append(response.json()["id"])
+        return response
+
+    async def update(self) -> httpx.Response | None:
+        # Only contacts this session created, so the seeded ones stay as seeded.
+        if not self.created:
+            return None
+        return await self.client.patch(
+            f"/api/contacts/{self.rng.choice(self.created)}",
+            json={"first_name": self.rng.choice(["Olena", "Taras", "Iryna"])},
+            headers=self.headers,
+        )
+
+    async def delete(self) -> httpx.Response | None:
+        if not self.created:
+            return None
+        return await self.client.delete(
+            f"/api/contacts/{self.created.pop()}", headers=self.headers
+        )
+
+
+ROUTES = ("signin", "list", "filter", "birthdays", "get", "create", "update", "delete")
+
+
+async def run_session(
+    session: Session,
+    mix: dict[str, int],
+    recorder: Recorder,
+    deadline: float,
+) -> None:
+    routes, weights = list(mix), list(mix.values())
+    await session.signin()
+    while time.perf_counter() < deadline:
+        route = session.rng.choices(routes, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await getattr(session, route)()
+        except httpx.HTTPError:
+            recorder.add(route, time.perf_counter() - started, False)
+            continue
+        if response is not None:
+            recorder.add(route, time.perf_counter() - started, response.is_success)
+    # Leave the dataset as it was seeded.
+    while session.created:
+        await session.delete()
+
+
+async def drive(
+    base_url: str,
+    dataset: Dataset,
+    mix: dict[str, int],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        if warmup > 0:
+            deadline = time.perf_counter() + warmup
+            sessions = [
+                Session(client, dataset, random.Random(seed - i - 1))
+                for i in range(concurrency)
+            ]
+            await asyncio.gather(
+                *(run_session(s, mix, Recorder(), deadline) for s in sessions)
+            )
+        recorder = Recorder()
+        started = time.perf_counter()
+        deadline = started + duration
+        sessions = [
+            Session(client, dataset, random.Random(seed + i)) for i in range(concurrency)
+        ]
+        await asyncio.gather(*(run_session(s, mix, recorder, deadline) for s in sessions))
+        return recorder.report(time.perf_counter() - started)
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    env = {**os.environ, "RATE_LIMIT_ENABLED": "false"}
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:create_app",
+            "--factory",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+
+
+async def wait_ready(base_url: str, server: subprocess.Popen | None, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                sys.exit("server exited during startup")
+            try:
+                await client.get("/openapi.json")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    sys.exit(f"server at {base_url} did not become ready in {timeout:.0f}s")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            regressions.append(f"{name}: no baseline, record one with --update")
+            continue
+        if result["rps"] < baseline[name]["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {baseline[name]['rps']} -> {result['rps']}")
+        for route, current in result["routes"].items():
+            before = baseline[name]["routes"].get(route)
+            if not before or min(current["requests"], before["requests"]) < MIN_SAMPLES:
+                continue
+            if current["rps"] < before["rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{name} {route}: rps {before['rps']} -> {current['rps']}"
+                )
+            if current["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{name} {route}: p99 {before['p99_ms']} -> {current['p99_ms']} ms"
+                )
+    return regressions
+
+
+async def main_async(args) -> dict:
+    settings = get_settings()
+    if not args.no_migrate:
+        subprocess.run(
+            [sys.executable, "-m", "alembic", "upgrade", "head"], cwd=ROOT, check=True
+        )
+    conn = await asyncpg.connect(asyncpg_dsn(settings.DB_URL))
+    try:
+        datasets = []
+        for name in args.dataset:
+            started = time.perf_counter()
+            datasets.append(await seed_dataset(conn, name, args.seed))
+            print(f"dataset {name}: ready in {time.perf_counter() - started:.1f}s")
+    finally:
+        await conn.close()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args.port, args.workers)
+    try:
+        await wait_ready(base_url, server)
+        results = {}
+        for dataset in datasets:
+            results[dataset.name] = await drive(
+                base_url,
+                dataset,
+                args.mix,
+                args.concurrency,
+                args.duration,
+                args.warmup,
+                args.seed,
+            )
+        return results
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", nargs="+", choices=DATASETS, default=["1k"])
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="benchmark a running server instead")
+    parser.add_argument("--no-migrate", action="store_true")
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--update", action="store_true", help="store a new baseline")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    report = {
+        "date": datetime.now(UTC).isoformat(timespec="seconds"),
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "workers": args.workers,
+        "mix": args.mix,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if any(r["errors"] for r in results.values()):
+        print("some requests failed, the baseline is neither checked nor updated")
+        return 1
+    if args.update:
+        baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+        baseline.update(results)
+        BASELINE.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"baseline written to {BASELINE.name}")
+        return 0
+    if not BASELINE.exists():
+        print(f"{BASELINE.name} is missing, record one with --update")
+        return 1
+    regressions = compare(results, json.loads(BASELINE.read_text()), args.tolerance)
+    for line in regressions:
+        print(f"regression: {line}")
+    return int(bool(regressions))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Startup-time benchmark based on `python -X importtime`.
+
+Imports `main` in a fresh interpreter with an empty environment, several
+times, and compares the median total import time with a stored baseline:
+
+    python benchmarks/startup_importtime.py             # compare
+    python benchmarks/startup_importtime.py --update    # record a new baseline
+
+Exits with status 1 when the median regresses by more than --tolerance
+against startup_baseline.json, when there is no baseline, when importing
+main builds the settings, or when one of the modules that must stay lazy is
+imported eagerly. Record the baseline again on the machine that runs the
+comparison, and after intended changes to the import graph.
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).with_name("startup_baseline.json")
+LAZY_MODULES = ("aiosmtplib", "passlib", "phonenumbers", "jinja2")
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+PROBE = (
+    "import main, src.conf.config as config; "
+    "assert config._settings is None, 'Settings() was built at import time'"
+)
+
+
+def measure() -> tuple[int, dict[str, int]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=ROOT,
+        env={},
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode:
+        sys.exit(proc.stderr.splitlines()[-1])
+    total = 0
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        total += int(self_us)
+        modules[name] = int(cumulative_us)
+    return total, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--update", action="store_true", help="store a new baseline")
+    args = parser.parse_args()
+
+    measure()  # warm the bytecode cache
+    runs = [measure() for _ in range(args.runs)]
+    median_us = int(statistics.median(total for total, _ in runs))
+    modules = runs[-1][1]
+
+    print(f"import main: median {median_us / 1000:.1f} ms over {args.runs} runs")
+    for name, cumulative_us in sorted(modules.items(), key=lambda m: -m[1])[:10]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = sorted(
+        name for name in modules if name.split(".")[0] in LAZY_MODULES
+    )
+    if eager:
+        print(f"eagerly imported: {', '.join(eager)}")
+        failed = True
+
+    if args.update:
+        BASELINE.write_text(json.dumps({"median_us": median_us}, indent=2) + "\n")
+        print(f"baseline written to {BASELINE.name}")
+        return int(failed)
+
+    if not BASELINE.exists():
+        print(f"{BASELINE.name} is missing, record one with --update")
+        return 1
+    baseline_us = json.loads(BASELINE.read_text())["median_us"]
+    change = median_us / baseline_us - 1
+    print(f"baseline {baseline_us / 1000:.1f} ms, change {change:+.1%}")
+    if change > args.tolerance:
+        print(f"regression above {args.tolerance:.0%}")
+        failed = True
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,51 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import SQLAlchemyError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from slowapi.errors import RateLimitExceeded
-
 from src.api import auth
 from src.api import contacts
 from src.api import users
-from src.conf.config import settings
+from src.api import stats
+from src.conf.config import Settings, configure, get_settings
+from src.database.db import ReadYourWritesMiddleware, sessionmanager
+from src.services.avatars import close_avatar_service
+from src.services.email import close_mail_dispatcher, get_mail_dispatcher
+from src.services.hashing import shutdown_password_hasher
+from src.services.phones import phone_normalizer
+from src.services.instrumentation import RequestInstrumentationMiddleware, set_enabled
+from src.services.metrics import MetricsMiddleware, mark_process_dead, metrics_endpoint
+from src.services.rate_limit import close_rate_limiter
 
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-app.include_router(contacts.router, prefix="/api", tags=["contacts"])
-app.include_router(auth.router, prefix="/api", tags=["auth"])
-app.include_router(users.router, prefix="/api", tags=["users"])
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    sessionmanager.init(settings.DB_URL, settings.DB_REPLICA_URLS)
+    if settings.PHONE_PRELOAD_METADATA:
+        phone_normalizer.preload()
+    warmup = min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE)
+    if warmup > 0:
+        try:
+            await sessionmanager.warmup(warmup, settings.DB_POOL_WARMUP_TIMEOUT)
+        except (OSError, SQLAlchemyError, TimeoutError) as e:
+            logger.warning("Database pool warm-up failed: %s", e)
+    get_mail_dispatcher().start()
+    yield
+    await close_mail_dispatcher()
+    await close_avatar_service()
+    await close_rate_limiter()
+    shutdown_password_hasher()
+    await sessionmanager.close()
+    mark_process_dead()
 
 
-@app.exception_handler(StarletteHTTPException)
 async def custom_404_handler(request, exc):
     if exc.status_code == 404 or exc.status_code == 405:
         return JSONResponse(
@@ -36,15 +56,6 @@ async def custom_404_handler(request, exc):
     raise exc
 
 
-@app.exception_handler(RateLimitExceeded)
-async def rate_limit_handler(request, exc):
-    return JSONResponse(
-        status_code=429,
-        content={"message": "Rate limit exceeded. Please try again later."},
-    )
-
-
-@app.exception_handler(HTTPException)
 async def exeption_handler(request, exc):
     if exc.status_code == 500:
         return JSONResponse(
@@ -54,10 +65,69 @@ async def exeption_handler(request, exc):
     return JSONResponse(
         status_code=exc.status_code,
         content={"message": exc.detail},
+        headers=exc.headers,
+    )
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    if settings is not None:
+        configure(settings)
+    settings = get_settings()
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[
+            "X-Next-Cursor",
+            "X-Total-Count",
+            "X-Total-Count-Exact",
+            "Retry-After",
+            "ETag",
+        ],
     )
 
+    if settings.DB_REPLICA_URLS:
+        app.add_middleware(ReadYourWritesMiddleware)
+
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+        app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+    # Added last so it is the outermost middleware and times everything.
+    set_enabled(settings.INSTRUMENTATION_ENABLED)
+    app.add_middleware(
+        RequestInstrumentationMiddleware,
+        server_timing=settings.SERVER_TIMING_ENABLED,
+        private_paths=("/api/auth/",),
+    )
+
+    app.include_router(contacts.router, prefix="/api", tags=["contacts"])
+    app.include_router(auth.router, prefix="/api", tags=["auth"])
+    app.include_router(users.router, prefix="/api", tags=["users"])
+    if settings.STATS_ENABLED:
+        app.include_router(stats.router, prefix="/api", tags=["stats"])
+
+    app.add_exception_handler(StarletteHTTPException, custom_404_handler)
+    app.add_exception_handler(HTTPException, exeption_handler)
+    return app
+
+
+def __getattr__(name: str):
+    # `uvicorn main:app` keeps working, but the app (and its settings) is only
+    # built when it is actually requested, not when main is imported.
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="127.0.0.1", port=8000, reload=True)
+    uvicorn.run(
+        "main:create_app", factory=True, host="127.0.0.1", port=8000, reload=True
+    )
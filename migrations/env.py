@@ -8,7 +8,7 @@ from sqlalchemy import pool
 from alembic import context
 
 from src.database.models import Base
-from src.conf.config import settings as app_config
+from src.conf.config import get_settings
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -24,7 +24,7 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
-config.set_main_option("sqlalchemy.url", app_config.DB_URL)
+config.set_main_option("sqlalchemy.url", get_settings().DB_URL)
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -0,0 +1,35 @@
+"""add contacts count to User
+
+Revision ID: 0b6e4d2a9c35
+Revises: f7a3c91e2d58
+Create Date: 2026-10-18 15:21:44.902317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6e4d2a9c35'
+down_revision: Union[str, Sequence[str], None] = 'f7a3c91e2d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'users',
+        sa.Column('contacts_count', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.execute(
+        'UPDATE users SET contacts_count = '
+        '(SELECT count(*) FROM contacts WHERE contacts.user_id = users.id)'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'contacts_count')
@@ -0,0 +1,32 @@
+"""add contact sort indexes
+
+Revision ID: 3c9d1f0a7b21
+Revises: 8e43aa2bcbb0
+Create Date: 2026-10-18 10:12:31.402115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d1f0a7b21'
+down_revision: Union[str, Sequence[str], None] = '8e43aa2bcbb0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_contacts_user_id_id', 'contacts', ['user_id', 'id'])
+    op.create_index('ix_contacts_user_id_last_name_id', 'contacts', ['user_id', 'last_name', 'id'])
+    op.create_index('ix_contacts_user_id_created_at_id', 'contacts', ['user_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contacts_user_id_created_at_id', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_last_name_id', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_id', table_name='contacts')
@@ -0,0 +1,46 @@
+"""add contact trigram indexes
+
+Revision ID: a57e2c4d9f13
+Revises: 3c9d1f0a7b21
+Create Date: 2026-10-18 11:04:52.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a57e2c4d9f13'
+down_revision: Union[str, Sequence[str], None] = '3c9d1f0a7b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRGM_COLUMNS = ('first_name', 'last_name', 'email')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm ships with contrib; on servers without it the search endpoint
+    # falls back to ILIKE, so the migration must not fail there.
+    available = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).scalar()
+    if not available:
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in TRGM_COLUMNS:
+        op.create_index(
+            f'ix_contacts_{column}_trgm',
+            'contacts',
+            [column],
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in reversed(TRGM_COLUMNS):
+        op.drop_index(f'ix_contacts_{column}_trgm', table_name='contacts', if_exists=True)
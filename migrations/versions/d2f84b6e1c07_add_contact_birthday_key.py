@@ -0,0 +1,41 @@
+"""add contact birthday key
+
+Revision ID: d2f84b6e1c07
+Revises: a57e2c4d9f13
+Create Date: 2026-10-18 11:47:09.530216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f84b6e1c07'
+down_revision: Union[str, Sequence[str], None] = 'a57e2c4d9f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'contacts',
+        sa.Column(
+            'birthday_key',
+            sa.SmallInteger(),
+            sa.Computed(
+                '(EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday))::smallint',
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index('ix_contacts_user_id_birthday_key', 'contacts', ['user_id', 'birthday_key'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contacts_user_id_birthday_key', table_name='contacts')
+    op.drop_column('contacts', 'birthday_key')
@@ -0,0 +1,38 @@
+"""include updated_at in contact indexes
+
+Revision ID: f7a3c91e2d58
+Revises: d2f84b6e1c07
+Create Date: 2026-10-18 14:05:32.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a3c91e2d58'
+down_revision: Union[str, Sequence[str], None] = 'd2f84b6e1c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    'ix_contacts_user_id_id': ['user_id', 'id'],
+    'ix_contacts_user_id_last_name_id': ['user_id', 'last_name', 'id'],
+    'ix_contacts_user_id_created_at_id': ['user_id', 'created_at', 'id'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, columns in INDEXES.items():
+        op.drop_index(name, table_name='contacts')
+        op.create_index(name, 'contacts', columns, postgresql_include=['updated_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, columns in INDEXES.items():
+        op.drop_index(name, table_name='contacts')
+        op.create_index(name, 'contacts', columns)
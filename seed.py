@@ -1,98 +1,235 @@
+"""Generate users and contacts for development and benchmarking.
+
+Users are seed-user-<n>@example.com, all with the same password and already
+verified. Contacts are generated in chunks by worker processes, each loading
+its chunk with COPY over its own connection. Every chunk draws from its own
+RNG, seeded from (--seed, user, chunk), so the data does not depend on the
+number of workers. Reruns replace the contacts of the generated users.
+
+    python seed.py                                   # 10 users x 1000 contacts
+    python seed.py --users 100 --contacts 100000 --workers 8
+    python seed.py --drop                            # remove generated users
+"""
+
 import argparse
 import asyncio
-from datetime import date, timedelta
-from faker import Faker
-from sqlalchemy import delete, select
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-
-from src.conf.config import settings as config
-from src.database.models import Contact, User
-
-fake = Faker()
-
-
-async def seed_contacts(session, user_id: int, count: int = 20):
-    contacts = []
-    for i in range(count):
-        days_offset = fake.random_int(min=-180, max=180)
-        birthday = date.today() + timedelta(days=days_offset)
-        birthday = birthday.replace(year=fake.random_int(min=1950, max=2005))
-        contact = Contact(
-            first_name=fake.first_name(),
-            last_name=fake.last_name(),
-            email=fake.unique.email(),
-            phone=f"+380{fake.random_number(digits=9, fix_len=True)}",
-            birthday=birthday,
-            additional_info=fake.text(max_nb_chars=100)
-            if fake.boolean(chance_of_getting_true=30)
-            else None,
-            user_id=user_id,
-        )
-        contacts.append(contact)
-    session.add_all(contacts)
-    await session.commit()
-    print(f"✅ Created {count} contacts")
-
-
-async def seed_contacts_with_upcoming_birthdays(session, user_id: int, count: int = 5):
-    contacts = []
-    for i in range(count):
-        days_ahead = fake.random_int(min=0, max=7)
-        upcoming_date = date.today() + timedelta(days=days_ahead)
-        birthday = upcoming_date.replace(year=fake.random_int(min=1960, max=2000))
-        contact = Contact(
-            first_name=f"Upcoming{i + 1}",
-            last_name=fake.last_name(),
-            email=fake.unique.email(),
-            phone=f"+380{fake.random_number(digits=9, fix_len=True)}",
-            birthday=birthday,
-            additional_info="Birthday coming soon!",
-            user_id=user_id,
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Iterator, List
+
+import asyncpg
+from faker.providers.lorem.en_US import Provider as LoremProvider
+from faker.providers.person.en_US import Provider as PersonProvider
+from sqlalchemy.engine import make_url
+
+FIRST_NAMES = list(PersonProvider.first_names)
+LAST_NAMES = list(PersonProvider.last_names)
+WORDS = list(LoremProvider.word_list)
+# Ukrainian mobile operator codes; each gives 10M distinct numbers per user.
+OPERATOR_CODES = ("50", "63", "66", "67", "68", "73", "93", "95", "96", "97", "98", "99")
+CONTACT_COLUMNS = (
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "birthday",
+    "additional_info",
+    "created_at",
+    "updated_at",
+    "user_id",
+)
+USER_EMAIL = "seed-user-{}@example.com"
+EPOCH = datetime(2024, 1, 1)
+
+
+def asyncpg_dsn(db_url: str) -> str:
+    return make_url(db_url).set(drivername="postgresql").render_as_string(
+        hide_password=False
+    )
+
+
+def phone_number(index: int) -> str:
+    code = OPERATOR_CODES[index // 10_000_000]
+    return f"+380{code}{index % 10_000_000:07d}"
+
+
+def contact_rows(
+    user_id: int,
+    start: int,
+    count: int,
+    seed: str,
+    upcoming: int = 0,
+    today: date | None = None,
+) -> Iterator[tuple]:
+    """Rows `start` to `start + count` of a user's contacts, in COPY column
+    order. Email and phone embed the row index, so both stay unique per user.
+    The first `upcoming` rows of the user get a birthday in the next week."""
+
+    rng = random.Random(seed)
+    today = today or date.today()
+    for index in range(start, start + count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        if index < upcoming:
+            soon = today + timedelta(days=rng.randint(0, 7))
+            if (soon.month, soon.day) == (2, 29):
+                soon -= timedelta(days=1)
+            birthday = soon.replace(year=rng.randint(1960, 2000))
+        else:
+            birthday = date(1950, 1, 1) + timedelta(days=rng.randrange(55 * 365))
+        info = None
+        if rng.random() < 0.3:
+            info = " ".join(rng.choices(WORDS, k=rng.randint(4, 12)))
+        created = EPOCH + timedelta(seconds=index * 7 + rng.randrange(7))
+        yield (
+            first,
+            last,
+            f"{first.lower()}.{last.lower()}.{index}@example.com",
+            phone_number(index),
+            birthday,
+            info,
+            created,
+            created,
+            user_id,
         )
-        contacts.append(contact)
-    session.add_all(contacts)
-    await session.commit()
-    print(f"✅ Created {count} contacts with upcoming birthdays")
-
-
-async def clear_database(session):
-    stmt = delete(Contact)
-    result = await session.execute(stmt)
-    await session.commit()
-    print(f"🗑️  Cleared {result.rowcount} contacts from database")
-
-
-async def get_contacts_count(session):
-    stmt = select(Contact)
-    result = await session.execute(stmt)
-    contacts = result.scalars().all()
-    return len(contacts)
-
-
-async def main(user_id: int):
-    engine = create_async_engine(config.DB_URL, echo=False)
-    async_session = async_sessionmaker(engine, expire_on_commit=False)
-    async with async_session() as session:
-        user = await session.get(User, user_id)
-        if not user:
-            user = User(email="seeduser@example.com", hashed_password="not_a_real_hash")
-            session.add(user)
-            await session.commit()
-            print(f"👤 Created default user with id {user.id}")
-            user_id = user.id
-        confirm = input("Do you want to clear existing data? (y/n): ")
-        if confirm.lower() == "y":
-            await clear_database(session)
-        await seed_contacts(session, user_id, count=20)
-        await seed_contacts_with_upcoming_birthdays(session, user_id, count=5)
-        total = await get_contacts_count(session)
-        print("\n✨ Database seeded successfully!")
-        print(f"📊 Total contacts in database: {total}")
-    await engine.dispose()
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Seed contacts for a user.")
-    parser.add_argument("--user-id", type=int, default=1, help="User ID for contacts")
+def load_chunk(
+    dsn: str, user_id: int, start: int, count: int, seed: str, upcoming: int
+) -> int:
+    """Worker process entry point: generate one chunk and COPY it. The
+    user's contacts_count is raised in the same transaction, so it matches
+    the loaded chunks even when other chunks fail."""
+
+    async def copy() -> None:
+        conn = await asyncpg.connect(dsn)
+        try:
+            async with conn.transaction():
+                await conn.copy_records_to_table(
+                    "contacts",
+                    records=contact_rows(user_id, start, count, seed, upcoming),
+                    columns=CONTACT_COLUMNS,
+                )
+                # Last, so the user's row is only locked until the commit.
+                await conn.execute(
+                    "UPDATE users SET contacts_count = contacts_count + $2 "
+                    "WHERE id = $1",
+                    user_id,
+                    count,
+                )
+        finally:
+            await conn.close()
+
+    asyncio.run(copy())
+    return count
+
+
+async def ensure_users(conn: asyncpg.Connection, count: int, password: str) -> List[int]:
+    from src.services.auth import Hash
+
+    password_hash = await Hash().get_password_hash(password)
+    rows = await conn.fetch(
+        "INSERT INTO users (email, password_hash, created_at, email_verified) "
+        "SELECT email, $2, now(), true FROM unnest($1::text[]) AS email "
+        "ON CONFLICT (email) DO UPDATE SET password_hash = EXCLUDED.password_hash "
+        "RETURNING id, email",
+        [USER_EMAIL.format(n) for n in range(1, count + 1)],
+        password_hash,
+    )
+    ids = {row["email"]: row["id"] for row in rows}
+    return [ids[USER_EMAIL.format(n)] for n in range(1, count + 1)]
+
+
+def report(done: int, total: int, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed else 0
+    eta = (total - done) / rate if rate else 0
+    print(
+        f"\r{done:>12,}/{total:,} contacts  {rate:>10,.0f} rows/s  eta {eta:5.0f}s",
+        end="",
+        flush=True,
+    )
+
+
+async def seed(args) -> None:
+    from src.conf.config import get_settings
+
+    dsn = asyncpg_dsn(get_settings().DB_URL)
+    conn = await asyncpg.connect(dsn)
+    try:
+        if args.drop:
+            result = await conn.execute(
+                "DELETE FROM users WHERE email LIKE 'seed-user-%@example.com'"
+            )
+            print(f"Removed {result.split()[-1]} generated users and their contacts")
+            return
+
+        user_ids = await ensure_users(conn, args.users, args.password)
+        async with conn.transaction():
+            await conn.execute("DELETE FROM contacts WHERE user_id = ANY($1)", user_ids)
+            await conn.execute(
+                "UPDATE users SET contacts_count = 0 WHERE id = ANY($1)", user_ids
+            )
+        print(f"{len(user_ids)} users ready, generating {args.contacts:,} contacts each")
+
+        tasks = [
+            (
+                dsn,
+                user_id,
+                start,
+                min(args.batch_size, args.contacts - start),
+                f"{args.seed}:{n}:{start}",
+                args.upcoming,
+            )
+            for n, user_id in enumerate(user_ids, 1)
+            for start in range(0, args.contacts, args.batch_size)
+        ]
+        total = args.users * args.contacts
+        done = 0
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        # Spawned rather than forked: the parent is running an event loop.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+            futures = [loop.run_in_executor(pool, load_chunk, *task) for task in tasks]
+            for future in asyncio.as_completed(futures):
+                done += await future
+                report(done, total, started)
+        print()
+
+        await conn.execute("ANALYZE contacts")
+        elapsed = time.perf_counter() - started
+        print(f"Loaded {total:,} contacts in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+    finally:
+        await conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--contacts", type=int, default=1000, help="contacts per user")
+    parser.add_argument(
+        "--upcoming",
+        type=int,
+        default=5,
+        help="contacts per user with a birthday in the next week",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--drop", action="store_true", help="remove generated users")
     args = parser.parse_args()
-    asyncio.run(main(args.user_id))
+    if args.contacts > len(OPERATOR_CODES) * 10_000_000:
+        parser.error("too many contacts per user for unique phone numbers")
+    asyncio.run(seed(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
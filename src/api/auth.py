@@ -25,14 +25,21 @@ from src.services.auth import (
     create_refresh_token,
     verify_refresh_token,
     get_email_from_token,
+    token_claims,
 )
+from src.services.rate_limit import rate_limit
 from src.services.users import UserService
 from src.database.db import get_db
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/signup", response_model=UserModel, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/signup",
+    response_model=UserModel,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[rate_limit("auth_signup", "RATE_LIMIT_SIGNUP")],
+)
 async def signup(
     user_data: UserCreate,
     background_tasks: BackgroundTasks,
@@ -48,7 +55,7 @@ async def signup(
             detail="User with this email already exists",
         )
 
-    user_data.password = Hash().get_password_hash(user_data.password)
+    user_data.password = await Hash().get_password_hash(user_data.password)
     new_user = await user_service.create_user(user_data)
     background_tasks.add_task(
         send_email, new_user.email, new_user.email, str(request.base_url)
@@ -56,12 +63,18 @@ async def signup(
     return new_user
 
 
-@router.post("/signin", response_model=Token)
+@router.post(
+    "/signin",
+    response_model=Token,
+    dependencies=[rate_limit("auth_signin", "RATE_LIMIT_SIGNIN")],
+)
 async def signin(
     form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
 ):
     user = await UserService(db).get_user_by_email(form_data.username)
-    if not user or not Hash().verify_password(form_data.password, user.password_hash):
+    if not user or not await Hash().verify_password(
+        form_data.password, user.password_hash
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -75,8 +88,8 @@ async def signin(
         )
 
     access_token, refresh_token = await asyncio.gather(
-        create_access_token(data={"sub": user.email}),
-        create_refresh_token(data={"sub": user.email}),
+        create_access_token(data=token_claims(user)),
+        create_refresh_token(data=token_claims(user)),
     )
     user.refresh_token = refresh_token
     await db.commit()
@@ -99,7 +112,7 @@ async def generate_access_token(
             detail="Unauthorized",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    new_access_token = await create_access_token(data={"sub": user.email})
+    new_access_token = await create_access_token(data=token_claims(user))
     return {
         "access_token": new_access_token,
         "refresh_token": body.refresh_token,
@@ -123,7 +136,12 @@ async def confirm_email(token: str, db: AsyncSession = Depends(get_db)):
     return {"message": "Email verified successfully."}
 
 
-@router.post("/request-confirmation-email")
+@router.post(
+    "/request-confirmation-email",
+    dependencies=[
+        rate_limit("auth_confirmation_email", "RATE_LIMIT_CONFIRMATION_EMAIL")
+    ],
+)
 async def request_confirmation_email(
     body: EmailVerificationRequest,
     background_tasks: BackgroundTasks,
@@ -1,6 +1,16 @@
-from typing import List
+from typing import List, Literal
 
-from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Depends,
+    Header,
+    Request,
+    Response,
+    status,
+    Query,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
@@ -8,53 +18,190 @@ from sqlalchemy.exc import IntegrityError
 from src.database.db import get_db
 from src.database.models import User
 from src.schemas import (
+    ContactBulkResult,
+    ContactBulkSelection,
+    ContactBulkUpdate,
     ContactResponse,
     ContactModel,
+    ContactPage,
     ContactShortResponse,
     ContactUpdate,
 )
-from src.services.contacts import ContactService
-from src.services.auth import get_current_user
+from src.conf.config import get_settings
+from src.services.contacts import ContactService, ContactVersionMismatch
+from src.services.contact_files import (
+    EXPORT_COLUMNS,
+    ImportTooLarge,
+    iter_csv_records,
+    iter_limited,
+    iter_lines,
+    iter_ndjson_records,
+)
+from src.services.serialization import FastJSONResponse, trusted_rows
+from src.services.etags import (
+    contact_etag,
+    if_match_versions,
+    if_none_match,
+    page_etag,
+)
+from src.services.auth import (
+    get_current_read_user,
+    get_current_user,
+    get_user_read_db,
+)
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
+# Clients may keep responses but have to revalidate them with the ETag.
+CACHE_CONTROL = "private, no-cache"
+
+
+def contact_list(response: Response, contacts: List, meta: dict | None = None):
+    """Return contacts through the response model, or as trusted rows when
+    CONTACTS_LIST_RESPONSE is "fast". With `meta` they are wrapped in a
+    ContactPage envelope."""
+    if get_settings().CONTACTS_LIST_RESPONSE != "fast":
+        return contacts if meta is None else {"items": contacts, "meta": meta}
+    items = trusted_rows(ContactShortResponse, contacts)
+    return FastJSONResponse(
+        items if meta is None else {"items": items, "meta": meta},
+        headers=dict(response.headers),
+    )
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+
 
-@router.get("", response_model=List[ContactShortResponse])
+@router.get("", response_model=List[ContactShortResponse] | ContactPage)
 async def get_contacts(
-    user: User = Depends(get_current_user),
+    response: Response,
+    user: User = Depends(get_current_read_user),
     page: int = Query(1, ge=1),
     show: int = Query(10, ge=1),
+    sort: Literal["id", "last_name", "created_at"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    cursor: str | None = None,
     first_name: str | None = None,
     last_name: str | None = None,
     email: str | None = None,
-    db: AsyncSession = Depends(get_db),
+    count: bool = Query(False, description="Send X-Total-Count headers"),
+    envelope: bool = Query(False, description="Wrap items in a ContactPage"),
+    if_none_match_header: str | None = Header(None, alias="If-None-Match"),
+    db: AsyncSession = Depends(get_user_read_db),
 ):
     contact_service = ContactService(db)
-    contacts = await contact_service.get_contacts(
-        user,
-        page,
-        show,
+    params = dict(
         filter={
             "first_name": first_name,
             "last_name": last_name,
             "email": email,
         },
+        sort=sort,
+        descending=order == "desc",
+        cursor=cursor,
+    )
+    total = exact = None
+    try:
+        if count or envelope:
+            total, exact = await contact_service.count_contacts(user, params["filter"])
+        if if_none_match_header:
+            versions = await contact_service.get_contact_versions(
+                user, page, show, **params
+            )
+            etag = page_etag(versions[:show], len(versions) > show, total)
+            if if_none_match(if_none_match_header, etag):
+                return not_modified(etag)
+        contacts, next_cursor = await contact_service.get_contacts(
+            user, page, show, **params
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["ETag"] = page_etag(
+        ((c.id, c.updated_at) for c in contacts), next_cursor is not None, total
+    )
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if total is None:
+        return contact_list(response, contacts)
+    if count:
+        response.headers["X-Total-Count"] = str(total)
+        response.headers["X-Total-Count-Exact"] = "true" if exact else "false"
+    meta = None
+    if envelope:
+        meta = {
+            "total": total,
+            "exact": exact,
+            "page": page,
+            "show": show,
+            "pages": -(-total // show),
+            "next_cursor": next_cursor,
+        }
+    return contact_list(response, contacts, meta)
+
+
+@router.get("/search", response_model=List[ContactShortResponse])
+async def search_contacts(
+    response: Response,
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    user: User = Depends(get_current_read_user),
+    db: AsyncSession = Depends(get_user_read_db),
+):
+    contact_service = ContactService(db)
+    contacts = await contact_service.search_contacts(user, q, limit)
+    return contact_list(response, contacts)
+
+
+@router.get("/export")
+async def export_contacts(
+    format: Literal["csv", "ndjson"] = "ndjson",
+    columns: str | None = Query(
+        None, description="Comma-separated list of columns, all by default"
+    ),
+    user: User = Depends(get_current_read_user),
+    db: AsyncSession = Depends(get_user_read_db),
+):
+    selected = [c.strip() for c in columns.split(",")] if columns else list(EXPORT_COLUMNS)
+    unknown = set(selected) - set(EXPORT_COLUMNS)
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown columns: {', '.join(sorted(unknown))}",
+        )
+    contact_service = ContactService(db)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        contact_service.export_contacts(user, selected, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
     )
-    return contacts
 
 
 @router.get("/{contact_id}", response_model=ContactResponse)
 async def get_contact(
     contact_id: int,
-    user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    if_none_match_header: str | None = Header(None, alias="If-None-Match"),
+    user: User = Depends(get_current_read_user),
+    db: AsyncSession = Depends(get_user_read_db),
 ):
     contact_service = ContactService(db)
+    if if_none_match_header:
+        version = await contact_service.get_contact_version(user, contact_id)
+        if version and if_none_match(if_none_match_header, contact_etag(*version)):
+            return not_modified(contact_etag(*version))
     contact = await contact_service.get_contact(user, contact_id)
     if not contact:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found"
         )
+    response.headers["ETag"] = contact_etag(contact.id, contact.updated_at)
+    response.headers["Cache-Control"] = CACHE_CONTROL
     return contact
 
 
@@ -83,30 +230,120 @@ async def create_contact(
         )
 
 
-@router.patch("{contact_id}", response_model=ContactResponse)
+@router.post("/import")
+async def import_contacts(
+    request: Request,
+    format: Literal["csv", "ndjson"] | None = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    settings = get_settings()
+    max_bytes = settings.CONTACTS_IMPORT_MAX_BYTES
+    max_length = settings.CONTACTS_IMPORT_MAX_RECORD_LENGTH
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Upload is larger than {max_bytes} bytes",
+        )
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+    lines = iter_lines(iter_limited(request.stream(), max_bytes), max_length)
+    if format == "csv":
+        records = iter_csv_records(lines, max_length)
+    else:
+        records = iter_ndjson_records(lines)
+    contact_service = ContactService(db)
+    try:
+        return await contact_service.import_contacts(user, records)
+    except ImportTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(e)
+        )
+
+
+def check_bulk_size(body: ContactBulkSelection) -> None:
+    settings = get_settings()
+    if body.ids and len(body.ids) > settings.CONTACTS_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.CONTACTS_BULK_MAX_ITEMS} contacts per request",
+        )
+
+
+@router.patch("/bulk", response_model=ContactBulkResult)
+async def bulk_update_contacts(
+    body: ContactBulkUpdate,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    check_bulk_size(body)
+    contact_service = ContactService(db)
+    try:
+        return await contact_service.bulk_update_contacts(user, body)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/bulk/delete", response_model=ContactBulkResult)
+async def bulk_delete_contacts(
+    body: ContactBulkSelection,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    check_bulk_size(body)
+    contact_service = ContactService(db)
+    return await contact_service.bulk_delete_contacts(user, body)
+
+
+def precondition_failed() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Contact has been modified",
+    )
+
+
+@router.patch("/{contact_id}", response_model=ContactResponse)
 async def update_contact(
     contact_id: int,
     contact: ContactUpdate,
+    response: Response,
+    if_match: str | None = Header(None, alias="If-Match"),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     contact_service = ContactService(db)
-    updated_contact = await contact_service.update_contact(user, contact_id, contact)
+    try:
+        updated_contact = await contact_service.update_contact(
+            user, contact_id, contact, if_match_versions(if_match, contact_id)
+        )
+    except ContactVersionMismatch:
+        raise precondition_failed()
     if not updated_contact:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found"
         )
+    response.headers["ETag"] = contact_etag(
+        updated_contact.id, updated_contact.updated_at
+    )
     return updated_contact
 
 
-@router.delete("{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_contact(
     contact_id: int,
+    if_match: str | None = Header(None, alias="If-Match"),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     contact_service = ContactService(db)
-    deleted_contact = await contact_service.delete_contact(user, contact_id)
+    try:
+        deleted_contact = await contact_service.delete_contact(
+            user, contact_id, if_match_versions(if_match, contact_id)
+        )
+    except ContactVersionMismatch:
+        raise precondition_failed()
     if deleted_contact is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found"
@@ -116,10 +353,15 @@ async def delete_contact(
 
 @router.get("/birthdays/upcoming", response_model=List[ContactShortResponse])
 async def get_upcoming_birthdays(
-    days_ahead: int = 7,
-    user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    days_ahead: int = Query(7, ge=0, le=365),
+    page: int = Query(1, ge=1),
+    show: int = Query(10, ge=1, le=100),
+    user: User = Depends(get_current_read_user),
+    db: AsyncSession = Depends(get_user_read_db),
 ):
     contact_service = ContactService(db)
-    contacts = await contact_service.get_upcoming_birthdays(user, days_ahead)
-    return contacts
+    contacts = await contact_service.get_upcoming_birthdays(
+        user, days_ahead, page, show
+    )
+    return contact_list(response, contacts)
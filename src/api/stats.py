@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Body, Depends
+
+from src.database.db import sessionmanager
+from src.services.auth import get_current_admin
+from src.services.email import get_mail_dispatcher
+from src.services.hashing import get_password_hasher
+from src.services import instrumentation
+from src.services.phones import phone_normalizer
+from src.services.tokens import get_token_cache
+
+router = APIRouter(
+    prefix="/stats", tags=["stats"], dependencies=[Depends(get_current_admin)]
+)
+
+
+@router.get("/hashing")
+async def get_hashing_stats():
+    return get_password_hasher().metrics()
+
+
+@router.get("/db-pool")
+async def get_db_pool_stats():
+    return sessionmanager.pool_stats()
+
+
+@router.get("/phones")
+async def get_phone_cache_stats():
+    return phone_normalizer.cache_info()._asdict()
+
+
+@router.get("/mail")
+async def get_mail_stats():
+    return get_mail_dispatcher().metrics()
+
+
+@router.get("/tokens")
+async def get_token_cache_stats():
+    return get_token_cache().metrics()
+
+
+@router.get("/instrumentation")
+async def get_instrumentation():
+    return {"enabled": instrumentation.is_enabled()}
+
+
+@router.put("/instrumentation")
+async def set_instrumentation(enabled: bool = Body(embed=True)):
+    # Applies to the worker process serving the request only.
+    instrumentation.set_enabled(enabled)
+    return {"enabled": instrumentation.is_enabled()}
@@ -1,15 +1,75 @@
+from typing import Annotated, Literal, NamedTuple
+
 from pydantic import EmailStr, SecretStr, field_validator
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimit(NamedTuple):
+    limit: int
+    window: int
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """Parse limits such as ``"5/minute"`` or ``"100/hour"``."""
+        count, _, period = value.partition("/")
+        period = period.strip().lower().rstrip("s")
+        if not count.strip().isdigit() or period not in PERIODS:
+            raise ValueError(f"Invalid rate limit: {value!r}")
+        return cls(int(count), PERIODS[period])
+
+
+# Read as "<count>/<period>"; an empty value disables the limit.
+RateLimitSetting = Annotated[RateLimit | None, NoDecode]
 
 
 class Settings(BaseSettings):
     DB_URL: str
+    DB_REPLICA_URLS: Annotated[list[str], NoDecode] = []
+    # Reads stay on the primary this long after the same client's last write.
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Connections opened at startup, capped at DB_POOL_SIZE.
+    DB_POOL_WARMUP: int = 1
+    DB_POOL_WARMUP_TIMEOUT: float = 10.0
+    # asyncpg prepared statement cache per connection, 0 behind pgbouncer.
+    DB_STATEMENT_CACHE_SIZE: int = 100
     JWT_SECRET: str
     JWT_ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_SECONDS: int
     REFRESH_TOKEN_EXPIRE_SECONDS: int
     VERIFICATION_TOKEN_EXPIRE_SECONDS: int
-    CORS_ORIGINS: list[str] = []
+    # Trust the user id carried in access tokens instead of loading the user
+    # on every request. Tokens of deleted users stay valid until they expire.
+    AUTH_STATELESS_PRINCIPAL: bool = False
+    # Verified token payloads kept in memory until they expire, 0 disables.
+    JWT_CACHE_SIZE: int = 4096
+    CORS_ORIGINS: Annotated[list[str], NoDecode] = []
+
+    CONTACTS_IMPORT_BATCH_SIZE: int = 500
+    CONTACTS_IMPORT_MAX_ERRORS: int = 1000
+    CONTACTS_IMPORT_MAX_BYTES: int = 50 * 1024 * 1024
+    # Longest line or (multi-line CSV) record, in characters.
+    CONTACTS_IMPORT_MAX_RECORD_LENGTH: int = 64 * 1024
+    CONTACTS_EXPORT_BATCH_SIZE: int = 1000
+    CONTACTS_BULK_MAX_ITEMS: int = 1000
+    # Filtered listings count matches exactly up to this many.
+    CONTACTS_COUNT_CAP: int = 10000
+    # "fast" encodes contact lists from the loaded rows without re-validating
+    # them through the response model.
+    CONTACTS_LIST_RESPONSE: Literal["pydantic", "fast"] = "pydantic"
+
+    # Load phonenumbers metadata for all regions at startup instead of lazily.
+    PHONE_PRELOAD_METADATA: bool = False
+
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
 
     SMTP_USER: str
     SMTP_PASSWORD: SecretStr
@@ -21,19 +81,100 @@ class Settings(BaseSettings):
     SMTP_SSL_TLS: bool = True
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
+    MAIL_POOL_SIZE: int = 2
+    MAIL_BATCH_SIZE: int = 20
+    MAIL_QUEUE_SIZE: int = 1000
+    MAIL_MAX_ATTEMPTS: int = 3
+    MAIL_RETRY_BACKOFF: float = 1.0
+    MAIL_TIMEOUT: float = 30.0
+    MAIL_SHUTDOWN_TIMEOUT: float = 10.0
+
+    CLOUDINARY_CLOUD_NAME: str = ""
+    CLOUDINARY_API_KEY: str = ""
+    CLOUDINARY_API_SECRET: str = ""
+    CLOUDINARY_API_URL: str = "https://api.cloudinary.com"
+
+    AVATAR_UPLOAD_CONCURRENCY: int = 4
+    AVATAR_UPLOAD_CHUNK_SIZE: int = 64 * 1024
+    AVATAR_UPLOAD_TIMEOUT: float = 30.0
+
+    # Per-request timings in a log line, and in a Server-Timing header when
+    # SERVER_TIMING_ENABLED. Admins can toggle it at runtime, per worker,
+    # through PUT /api/stats/instrumentation.
+    INSTRUMENTATION_ENABLED: bool = True
+    # Server-Timing tells any client how many queries a request ran and how
+    # long hashing took; it is never sent on /api/auth/*.
+    SERVER_TIMING_ENABLED: bool = False
+    # /api/stats/* reports process, pool and queue internals to ADMIN_EMAILS.
+    STATS_ENABLED: bool = False
+    ADMIN_EMAILS: Annotated[list[str], NoDecode] = []
+
+    # Prometheus metrics on /metrics. With several uvicorn workers, set the
+    # PROMETHEUS_MULTIPROC_DIR environment variable (not read from .env) to a
+    # directory shared by them, emptied on deploy, so every scrape reports
+    # all workers.
+    METRICS_ENABLED: bool = True
+
+    RATE_LIMIT_ENABLED: bool = True
+    # "memory" is per process, "shared" is shared by workers on one host
+    # through RATE_LIMIT_SHARED_PATH, "redis" by every instance.
+    RATE_LIMIT_BACKEND: Literal["memory", "shared", "redis"] = "shared"
+    RATE_LIMIT_SHARED_PATH: str = "/tmp/contacts-rate-limit"
+    RATE_LIMIT_SHARED_SLOTS: int = 65536
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    # When the backend cannot count a hit (Redis down, shared table full):
+    # let the request through and log a warning, or answer 503.
+    RATE_LIMIT_FAIL_OPEN: bool = True
+    # Per-route limits as "<count>/<second|minute|hour|day>", empty disables.
+    RATE_LIMIT_SIGNUP: RateLimitSetting = RateLimit.parse("5/minute")
+    RATE_LIMIT_SIGNIN: RateLimitSetting = RateLimit.parse("10/minute")
+    RATE_LIMIT_CONFIRMATION_EMAIL: RateLimitSetting = RateLimit.parse("3/minute")
+    RATE_LIMIT_ME: RateLimitSetting = RateLimit.parse("2/minute")
+    RATE_LIMIT_AVATAR: RateLimitSetting = RateLimit.parse("10/minute")
 
-    CLOUDINARY_CLOUD_NAME: str
-    CLOUDINARY_API_KEY: str
-    CLOUDINARY_API_SECRET: str
     model_config = SettingsConfigDict(
         extra="ignore", env_file=".env", env_file_encoding="utf-8", case_sensitive=True
     )
 
-    @field_validator("CORS_ORIGINS", mode="before")
+    @field_validator("CORS_ORIGINS", "DB_REPLICA_URLS", "ADMIN_EMAILS", mode="before")
     def parse_cors_origins_string(cls, v):
         if isinstance(v, str):
-            return [i.strip() for i in v.split(",")]
+            return [i.strip() for i in v.split(",") if i.strip()]
+        return v
+
+    @field_validator(
+        "RATE_LIMIT_SIGNUP",
+        "RATE_LIMIT_SIGNIN",
+        "RATE_LIMIT_CONFIRMATION_EMAIL",
+        "RATE_LIMIT_ME",
+        "RATE_LIMIT_AVATAR",
+        mode="before",
+    )
+    def parse_rate_limit(cls, v):
+        # Parsed once here, so a malformed limit fails at startup.
+        if isinstance(v, str):
+            return RateLimit.parse(v) if v.strip() else None
         return v
 
 
-settings = Settings()  # type: ignore[arg-type]
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    """Build the settings on first use so importing the app stays cheap."""
+    global _settings
+    if _settings is None:
+        _settings = Settings()  # type: ignore[arg-type]
+    return _settings
+
+
+def configure(settings: Settings) -> None:
+    global _settings
+    _settings = settings
+
+
+def __getattr__(name: str):
+    # Keeps `from src.conf.config import settings` working for scripts.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,24 +1,159 @@
+import asyncio
 import contextlib
+import itertools
+import math
+import os
+import time
+from contextvars import ContextVar
+
+from greenlet import getcurrent
+from sqlalchemy import event, text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.datastructures import MutableHeaders
+
+from src.conf.config import get_settings
+from src.services.instrumentation import instrument_engine, record_pool_wait
+from src.services.metrics import (
+    DB_POOL_CHECKED_IN,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_WAIT,
+)
+
+PRIMARY_READS_COOKIE = "primary_reads"
+
+# Commits made while handling the current request; see ReadYourWritesMiddleware.
+_request_commits: ContextVar[list | None] = ContextVar("request_commits", default=None)
+
 
-from src.conf.config import settings
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection, and
+    keeps the pool gauges current as connections come and go."""
+
+    # Value of the "pool" label, set by DatabaseSessionManager.
+    metrics_label = "primary"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._timing: set = set()
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        record = super()._create_connection()
+        record._connect_seconds = time.perf_counter() - started
+        return record
+
+    def _do_get(self):
+        # QueuePool._do_get calls itself to retry; only the outermost call
+        # of each greenlet is timed.
+        current = getcurrent()
+        if current in self._timing:
+            return super()._do_get()
+        self._timing.add(current)
+        started = time.perf_counter()
+        record = None
+        try:
+            record = super()._do_get()
+            return record
+        finally:
+            self._timing.discard(current)
+            # Opening a new connection is not waiting for the pool.
+            connect = record.__dict__.pop("_connect_seconds", 0.0) if record else 0.0
+            waited = time.perf_counter() - started - connect
+            record_pool_wait(waited)
+            DB_POOL_WAIT.observe(waited)
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.update_metrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_label = self.metrics_label
+        return pool
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self.update_metrics()
+
+    def update_metrics(self) -> None:
+        pool = self.metrics_label
+        DB_POOL_SIZE.labels(pool=pool).set(self.size())
+        DB_POOL_CHECKED_IN.labels(pool=pool).set(self.checkedin())
+        DB_POOL_CHECKED_OUT.labels(pool=pool).set(self.checkedout())
+        DB_POOL_OVERFLOW.labels(pool=pool).set(max(self.overflow(), 0))
 
 
 class DatabaseSessionManager:
-    def __init__(self, url: str):
-        self._engine: AsyncEngine = create_async_engine(url)
-        self._session_maker: async_sessionmaker = async_sessionmaker(
+    def __init__(self):
+        self._engine: AsyncEngine | None = None
+        self._session_maker: async_sessionmaker | None = None
+        self._replica_engines: list[AsyncEngine] = []
+        self._replica_session_makers = itertools.cycle([])
+
+    def init(self, url: str, replica_urls: list[str] | None = None) -> None:
+        self._engine = self._create_engine(url, "primary")
+        self._session_maker = async_sessionmaker(
             bind=self._engine,
             autoflush=False,
             autocommit=False,
+            expire_on_commit=False,
+            info={"primary": True},
         )
+        self._replica_engines = [
+            self._create_engine(replica_url, f"replica-{n}")
+            for n, replica_url in enumerate(replica_urls or [])
+        ]
+        self._replica_session_makers = itertools.cycle(
+            [
+                async_sessionmaker(
+                    bind=engine,
+                    autoflush=False,
+                    autocommit=False,
+                    expire_on_commit=False,
+                )
+                for engine in self._replica_engines
+            ]
+        )
+
+    @staticmethod
+    def _create_engine(url: str, metrics_label: str) -> AsyncEngine:
+        settings = get_settings()
+        engine = create_async_engine(
+            url,
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            connect_args={
+                "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+                "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            },
+        )
+        instrument_engine(engine)
+        engine.pool.metrics_label = metrics_label
+        engine.pool.update_metrics()
+        return engine
 
     @contextlib.asynccontextmanager
-    async def session(self):
+    async def session(self, readonly: bool = False):
+        """Open a session on the primary, or on a replica when `readonly`."""
+
         if self._session_maker is None:
             raise Exception("Database session maker is not initialized")
-        session = self._session_maker()
+        if readonly and self._replica_engines:
+            session = next(self._replica_session_makers)()
+        else:
+            session = self._session_maker()
         try:
             yield session
         except SQLAlchemyError as e:
@@ -27,8 +162,119 @@ class DatabaseSessionManager:
         finally:
             await session.close()
 
+    async def warmup(self, connections: int, timeout: float = 10.0) -> None:
+        """Open `connections` pooled connections up front so the first
+        requests after startup do not pay for the connect handshake."""
+
+        async def ping(engine: AsyncEngine, barrier: asyncio.Barrier):
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                    # Hold the connection until all of them are open, otherwise
+                    # the pool hands the same one back every time.
+                    await barrier.wait()
+            except BaseException:
+                # Release the others instead of leaving them at the barrier.
+                await barrier.abort()
+                raise
+
+        async with asyncio.timeout(timeout):
+            for engine in [self._engine, *self._replica_engines]:
+                barrier = asyncio.Barrier(connections)
+                results = await asyncio.gather(
+                    *(ping(engine, barrier) for _ in range(connections)),
+                    return_exceptions=True,
+                )
+                for result in results:
+                    if isinstance(result, BaseException) and not isinstance(
+                        result, asyncio.BrokenBarrierError
+                    ):
+                        raise result
+
+    async def close(self) -> None:
+        if self._engine is None:
+            return
+        for engine in [self._engine, *self._replica_engines]:
+            await engine.dispose()
+        self._engine = None
+        self._session_maker = None
+        self._replica_engines = []
+        self._replica_session_makers = itertools.cycle([])
+
+    def pool_stats(self) -> dict:
+        if self._engine is None:
+            return {}
+        stats = self._pool_stats(self._engine)
+        if self._replica_engines:
+            stats["replicas"] = [
+                self._pool_stats(engine) for engine in self._replica_engines
+            ]
+        return stats
+
+    @staticmethod
+    def _pool_stats(engine: AsyncEngine) -> dict:
+        pool = engine.pool
+        stats = {
+            "pid": os.getpid(),
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": get_settings().DB_MAX_OVERFLOW,
+        }
+        if isinstance(pool, InstrumentedQueuePool):
+            stats.update(
+                checkouts=pool.checkouts,
+                avg_wait_seconds=pool.total_wait / (pool.checkouts or 1),
+                max_wait_seconds=pool.max_wait,
+            )
+        return stats
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_write(session: Session) -> None:
+    commits = _request_commits.get()
+    if commits is not None and session.info.get("primary"):
+        commits.append(time.time())
+
+
+class ReadYourWritesMiddleware:
+    """Pins a client's reads to the primary after it commits a write.
+
+    A response to a request that committed on the primary sets a short-lived
+    cookie; read-only sessions opened for requests carrying it use the
+    primary instead of a replica that may not have the write yet. The cookie
+    lives on the client, so this holds across workers and hosts.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        commits = []
+        token = _request_commits.set(commits)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and commits:
+                max_age = math.ceil(get_settings().DB_READ_YOUR_WRITES_SECONDS)
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{PRIMARY_READS_COOKIE}=1; Max-Age={max_age}; Path=/; "
+                    "HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_commits.reset(token)
+
 
-sessionmanager = DatabaseSessionManager(settings.DB_URL)
+sessionmanager = DatabaseSessionManager()
 
 
 async def get_db():
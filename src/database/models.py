@@ -1,8 +1,8 @@
 from datetime import date, datetime
 
-from sqlalchemy import func
-from sqlalchemy.schema import ForeignKey, UniqueConstraint
-from sqlalchemy.types import Integer, String, Date, Text, DateTime
+from sqlalchemy import Computed, func
+from sqlalchemy.schema import ForeignKey, Index, UniqueConstraint
+from sqlalchemy.types import Integer, SmallInteger, String, Date, Text, DateTime
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -15,6 +15,46 @@ class Contact(Base):
     __table_args__ = (
         UniqueConstraint("email", "user_id", name="uq_contact_email_user"),
         UniqueConstraint("phone", "user_id", name="uq_contact_phone_user"),
+        # updated_at is included so ETag checks are index-only scans.
+        Index(
+            "ix_contacts_user_id_id",
+            "user_id",
+            "id",
+            postgresql_include=["updated_at"],
+        ),
+        Index(
+            "ix_contacts_user_id_last_name_id",
+            "user_id",
+            "last_name",
+            "id",
+            postgresql_include=["updated_at"],
+        ),
+        Index(
+            "ix_contacts_user_id_created_at_id",
+            "user_id",
+            "created_at",
+            "id",
+            postgresql_include=["updated_at"],
+        ),
+        Index("ix_contacts_user_id_birthday_key", "user_id", "birthday_key"),
+        Index(
+            "ix_contacts_first_name_trgm",
+            "first_name",
+            postgresql_using="gin",
+            postgresql_ops={"first_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_contacts_last_name_trgm",
+            "last_name",
+            postgresql_using="gin",
+            postgresql_ops={"last_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_contacts_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -23,7 +63,18 @@ class Contact(Base):
     email: Mapped[str] = mapped_column(String(255), nullable=False)
     phone: Mapped[str] = mapped_column(String(20), nullable=False)
     birthday: Mapped[date | None] = mapped_column(Date, nullable=True)
-    additional_info: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # MMDD of the birthday, e.g. 1231 for Dec 31, maintained by Postgres.
+    birthday_key: Mapped[int | None] = mapped_column(
+        SmallInteger,
+        Computed(
+            "(EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday))::smallint",
+            persisted=True,
+        ),
+    )
+    # Unbounded, so only loaded by the queries that return it (see undefer()).
+    additional_info: Mapped[str | None] = mapped_column(
+        Text, nullable=True, deferred=True
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime, nullable=False, default=func.now()
     )
@@ -50,3 +101,7 @@ class User(Base):
     avatar_url: Mapped[str | None] = mapped_column(String(255), nullable=True)
     refresh_token: Mapped[str | None] = mapped_column(String(255), nullable=True)
     email_verified: Mapped[bool] = mapped_column(nullable=False, default=False)
+    # Kept in step with the user's contacts by the contact repository.
+    contacts_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
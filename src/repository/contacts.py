@@ -1,86 +1,421 @@
-from typing import List
-from datetime import date
+from calendar import isleap
+from typing import AsyncIterator, List, Sequence
+from datetime import date, datetime
 
-from sqlalchemy import Integer, and_, cast, func, select
+from sqlalchemy import (
+    Integer,
+    Row,
+    and_,
+    any_,
+    bindparam,
+    delete,
+    func,
+    literal,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 
 from src.database.models import Contact, User
 from src.schemas import ContactModel, ContactUpdate
 
+SORT_COLUMNS = {
+    "id": Contact.id,
+    "last_name": Contact.last_name,
+    "created_at": Contact.created_at,
+}
+
+# What list responses show, plus updated_at for their ETags.
+LIST_COLUMNS = (
+    Contact.id,
+    Contact.first_name,
+    Contact.last_name,
+    Contact.email,
+    Contact.phone,
+    Contact.updated_at,
+)
+
+
+def birthday_key(day: date) -> int:
+    return day.month * 100 + day.day
+
+
+def like_pattern(value: str) -> str:
+    """ILIKE pattern matching `value` anywhere, with its wildcards escaped."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def filter_conditions(filter: dict | None) -> list:
+    conditions = []
+    if filter:
+        if filter.get("first_name"):
+            conditions.append(
+                Contact.first_name.ilike(like_pattern(filter["first_name"]), escape="\\")
+            )
+        if filter.get("last_name"):
+            conditions.append(
+                Contact.last_name.ilike(like_pattern(filter["last_name"]), escape="\\")
+            )
+        if filter.get("email"):
+            conditions.append(Contact.email == filter["email"])
+    return conditions
+
 
 class ContactRepository:
+    _trigram_available: bool | None = None
+
     def __init__(self, db_session: AsyncSession):
         self.db = db_session
 
-    async def get_contacts(
-        self, user: User, skip: int, limit: int, filter: dict | None = None
-    ) -> List[Contact]:
-        stmt = select(Contact).filter_by(user_id=user.id)
+    async def has_trigram_search(self) -> bool:
+        if ContactRepository._trigram_available is None:
+            result = await self.db.execute(
+                text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            )
+            ContactRepository._trigram_available = bool(result.scalar())
+        return ContactRepository._trigram_available
+
+    def _page_stmt(
+        self,
+        entities: tuple,
+        user: User,
+        skip: int,
+        limit: int,
+        filter: dict | None,
+        sort: str,
+        descending: bool,
+        after: tuple | None,
+    ):
+        stmt = select(*entities).filter_by(user_id=user.id)
+
+        conditions = filter_conditions(filter)
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+
+        column = SORT_COLUMNS[sort]
+        if sort == "id":
+            order_by = [Contact.id]
+            key = Contact.id
+        else:
+            order_by = [column, Contact.id]
+            key = tuple_(column, Contact.id)
 
-        if filter:
-            conditions = []
-            if filter.get("first_name"):
-                conditions.append(Contact.first_name.ilike(f"%{filter['first_name']}%"))
-            if filter.get("last_name"):
-                conditions.append(Contact.last_name.ilike(f"%{filter['last_name']}%"))
-            if filter.get("email"):
-                conditions.append(Contact.email == filter["email"])
+        if after is not None:
+            value = after[-1] if sort == "id" else tuple_(*after)
+            stmt = stmt.where(key < value if descending else key > value)
+        else:
+            stmt = stmt.offset(skip)
 
-            if conditions:
-                stmt = stmt.where(and_(*conditions))
+        if descending:
+            order_by = [c.desc() for c in order_by]
+        return stmt.order_by(*order_by).limit(limit)
 
-        stmt = stmt.offset(skip).limit(limit)
+    async def get_contacts(
+        self,
+        user: User,
+        skip: int,
+        limit: int,
+        filter: dict | None = None,
+        sort: str = "id",
+        descending: bool = False,
+        after: tuple | None = None,
+    ) -> List[Row]:
+        """Get a page of contacts ordered by `sort` with `id` as a tie-breaker.
+
+        When `after` holds the (sort value, id) pair of the last seen row the
+        page is fetched with a keyset condition instead of OFFSET. Rows only
+        carry LIST_COLUMNS and the sort column.
+        """
 
+        columns = LIST_COLUMNS
+        if SORT_COLUMNS[sort] not in columns:
+            columns += (SORT_COLUMNS[sort],)
+        stmt = self._page_stmt(
+            columns, user, skip, limit, filter, sort, descending, after
+        )
         contacts = await self.db.execute(stmt)
-        result = list(contacts.scalars().all())
-        return result
+        return list(contacts.all())
+
+    async def get_contact_versions(
+        self,
+        user: User,
+        skip: int,
+        limit: int,
+        filter: dict | None = None,
+        sort: str = "id",
+        descending: bool = False,
+        after: tuple | None = None,
+    ) -> List[Row]:
+        """(id, updated_at) of the rows `get_contacts` would return. Without
+        a filter this is served by an index-only scan of the sort index."""
+
+        stmt = self._page_stmt(
+            (Contact.id, Contact.updated_at),
+            user,
+            skip,
+            limit,
+            filter,
+            sort,
+            descending,
+            after,
+        )
+        result = await self.db.execute(stmt)
+        return list(result.all())
+
+    async def stream_contacts(
+        self, user: User, columns: List[str], batch_size: int
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Yield all of the user's contacts in batches from a server-side cursor."""
+
+        stmt = (
+            select(*(getattr(Contact, column) for column in columns))
+            .where(Contact.user_id == user.id)
+            .order_by(Contact.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.db.stream(stmt)
+        async for partition in result.partitions():
+            yield partition
+
+    async def search_contacts(self, user: User, query: str, limit: int) -> List[Row]:
+        """Search contacts by name or email, best matches first.
+
+        Uses pg_trgm similarity when the extension is installed, so both the
+        substring and the fuzzy conditions are served by the GIN indexes.
+        Otherwise falls back to a plain ILIKE scan.
+        """
+
+        pattern = like_pattern(query)
+        columns = (Contact.first_name, Contact.last_name, Contact.email)
+        conditions = [column.ilike(pattern, escape="\\") for column in columns]
+
+        stmt = select(*LIST_COLUMNS).where(Contact.user_id == user.id)
+        if await self.has_trigram_search():
+            conditions += [column.op("%")(query) for column in columns]
+            score = func.greatest(*(func.similarity(column, query) for column in columns))
+            stmt = stmt.where(or_(*conditions)).order_by(score.desc(), Contact.id)
+        else:
+            stmt = stmt.where(or_(*conditions)).order_by(
+                Contact.last_name, Contact.first_name, Contact.id
+            )
+
+        contacts = await self.db.execute(stmt.limit(limit))
+        return list(contacts.all())
 
     async def get_contact(self, user: User, contact_id: int) -> Contact | None:
-        stmt = select(Contact).filter_by(id=contact_id, user_id=user.id)
+        stmt = (
+            select(Contact)
+            .filter_by(id=contact_id, user_id=user.id)
+            .options(undefer(Contact.additional_info))
+        )
         result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_contact_version(self, user: User, contact_id: int) -> Row | None:
+        stmt = select(Contact.id, Contact.updated_at).filter_by(
+            id=contact_id, user_id=user.id
+        )
+        result = await self.db.execute(stmt)
+        return result.one_or_none()
+
+    async def get_contacts_count(self, user: User) -> int:
+        stmt = select(User.contacts_count).where(User.id == user.id)
+        return await self.db.scalar(stmt) or 0
+
+    async def count_contacts(self, user: User, filter: dict | None, cap: int) -> int:
+        """Exact number of contacts matching `filter`, but at most `cap + 1`,
+        so a broad filter stops counting early."""
+
+        matching = (
+            select(Contact.id)
+            .where(Contact.user_id == user.id, *filter_conditions(filter))
+            .limit(cap + 1)
+        )
+        stmt = select(func.count()).select_from(matching.subquery())
+        return await self.db.scalar(stmt)
+
+    async def _adjust_contacts_count(self, user: User, delta: int) -> None:
+        # Runs in the same transaction as the write it accounts for.
+        if delta:
+            stmt = (
+                update(User)
+                .where(User.id == user.id)
+                .values(contacts_count=User.contacts_count + delta)
+                .execution_options(synchronize_session=False)
+            )
+            await self.db.execute(stmt)
+
     async def create_contact(self, user: User, body: ContactModel) -> Contact:
-        new_contact = Contact(**body.model_dump(exclude_unset=True), user_id=user.id)
-        self.db.add(new_contact)
+        stmt = (
+            insert(Contact)
+            .values(**body.model_dump(exclude_unset=True), user_id=user.id)
+            .returning(Contact)
+            .options(undefer(Contact.additional_info))
+        )
+        new_contact = await self.db.scalar(stmt)
+        await self._adjust_contacts_count(user, 1)
         await self.db.commit()
-        await self.db.refresh(new_contact)
         return new_contact
 
+    async def insert_contacts(self, user: User, rows: List[dict]) -> set[tuple]:
+        """Insert many contacts at once, skipping rows that hit a unique
+        constraint. Returns the (email, phone) pairs that were inserted."""
+
+        stmt = (
+            insert(Contact)
+            .on_conflict_do_nothing()
+            .returning(Contact.email, Contact.phone)
+        )
+        result = await self.db.execute(stmt, [{**row, "user_id": user.id} for row in rows])
+        inserted = {(row.email, row.phone) for row in result}
+        await self._adjust_contacts_count(user, len(inserted))
+        await self.db.commit()
+        return inserted
+
     async def update_contact(
-        self, user: User, contact_id: int, body: ContactUpdate
+        self,
+        user: User,
+        contact_id: int,
+        body: ContactUpdate,
+        versions: List[datetime] | None = None,
     ) -> Contact | None:
-        contact = await self.get_contact(user, contact_id)
-        if contact:
-            for key, value in body.model_dump(exclude_unset=True).items():
-                setattr(contact, key, value)
-            self.db.add(contact)
-            await self.db.commit()
-            await self.db.refresh(contact)
+        """Update a contact. With `versions` only a contact whose `updated_at`
+        is one of them is changed."""
+
+        values = body.model_dump(exclude_unset=True)
+        if not values:
+            contact = await self.get_contact(user, contact_id)
+            if contact and versions is not None and contact.updated_at not in versions:
+                return None
             return contact
+        stmt = (
+            update(Contact)
+            .where(Contact.id == contact_id, Contact.user_id == user.id)
+            .values(**values)
+            .returning(Contact)
+            .options(undefer(Contact.additional_info))
+        )
+        if versions is not None:
+            stmt = stmt.where(Contact.updated_at.in_(versions))
+        contact = await self.db.scalar(stmt)
+        await self.db.commit()
         return contact
 
-    async def delete_contact(self, user: User, contact_id: int) -> Contact | None:
-        contact = await self.get_contact(user, contact_id)
-        if contact:
-            await self.db.delete(contact)
-            await self.db.commit()
-            return contact
+    async def delete_contact(
+        self, user: User, contact_id: int, versions: List[datetime] | None = None
+    ) -> Contact | None:
+        stmt = (
+            delete(Contact)
+            .where(Contact.id == contact_id, Contact.user_id == user.id)
+            .returning(Contact)
+            .options(undefer(Contact.additional_info))
+        )
+        if versions is not None:
+            stmt = stmt.where(Contact.updated_at.in_(versions))
+        contact = await self.db.scalar(stmt)
+        if contact is not None:
+            await self._adjust_contacts_count(user, -1)
+        await self.db.commit()
         return contact
 
-    async def get_contacts_with_birthday_in_period(
-        self, user: User, start_date: date, end_date: date
-    ) -> List[Contact]:
-        """Get contacts who will have a birthday between two dates"""
-
-        stmt = select(Contact).where(
-            Contact.user_id == user.id,
-            Contact.birthday.isnot(None),
-            cast(func.extract("year", func.age(start_date, Contact.birthday)), Integer)
-            != cast(
-                func.extract("year", func.age(end_date, Contact.birthday)), Integer
-            ),
+    def _bulk_selection(
+        self, user: User, ids: List[int] | None, filter: dict | None, limit: int
+    ) -> tuple:
+        """WHERE clause selecting the contacts of a bulk operation, and a
+        column telling whether a filter matched more than `limit` of them."""
+
+        if ids is not None:
+            selection = Contact.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+            return selection, literal(False)
+        # One row past the limit tells whether the filter was cut off.
+        matched = (
+            select(Contact.id)
+            .where(Contact.user_id == user.id, *filter_conditions(filter))
+            .order_by(Contact.id)
+            .limit(limit + 1)
+            .cte("matched")
+        )
+        selection = Contact.id.in_(
+            select(matched.c.id).order_by(matched.c.id).limit(limit).scalar_subquery()
         )
+        matched_count = select(func.count()).select_from(matched).scalar_subquery()
+        return selection, matched_count > limit
 
-        contacts = await self.db.execute(stmt)
-        return list(contacts.scalars().all())
+    async def _bulk_write(self, stmt, truncated) -> tuple[List[int], bool]:
+        result = await self.db.execute(
+            stmt.returning(Contact.id, truncated.label("truncated")).execution_options(
+                synchronize_session=False
+            )
+        )
+        rows = result.all()
+        return [row.id for row in rows], any(row.truncated for row in rows)
+
+    async def bulk_update_contacts(
+        self,
+        user: User,
+        values: dict,
+        ids: List[int] | None = None,
+        filter: dict | None = None,
+        limit: int = 1000,
+    ) -> tuple[List[int], bool]:
+        """Update the selected contacts in one statement. Returns their ids,
+        and whether a filter matched more than `limit` contacts, in which case
+        only the `limit` with the lowest ids were changed."""
+
+        selection, truncated = self._bulk_selection(user, ids, filter, limit)
+        stmt = (
+            update(Contact)
+            .where(Contact.user_id == user.id, selection)
+            .values(**values)
+        )
+        affected, truncated = await self._bulk_write(stmt, truncated)
+        await self.db.commit()
+        return affected, truncated
+
+    async def bulk_delete_contacts(
+        self,
+        user: User,
+        ids: List[int] | None = None,
+        filter: dict | None = None,
+        limit: int = 1000,
+    ) -> tuple[List[int], bool]:
+        selection, truncated = self._bulk_selection(user, ids, filter, limit)
+        stmt = delete(Contact).where(Contact.user_id == user.id, selection)
+        affected, truncated = await self._bulk_write(stmt, truncated)
+        await self._adjust_contacts_count(user, -len(affected))
+        await self.db.commit()
+        return affected, truncated
+
+    async def get_contacts_with_birthday_in_period(
+        self, user: User, start_date: date, end_date: date, skip: int, limit: int
+    ) -> List[Row]:
+        """Get contacts who will have a birthday between two dates, inclusive"""
+
+        start_key = birthday_key(start_date)
+        end_key = birthday_key(end_date)
+        # Feb 29 birthdays are celebrated on Feb 28 in common years.
+        if end_key == 228 and not isleap(end_date.year):
+            end_key = 229
+
+        stmt = select(*LIST_COLUMNS).where(Contact.user_id == user.id)
+        if (end_date - start_date).days >= 365:
+            stmt = stmt.where(Contact.birthday_key.isnot(None))
+        elif start_key <= end_key:
+            stmt = stmt.where(Contact.birthday_key.between(start_key, end_key))
+        else:
+            stmt = stmt.where(
+                or_(Contact.birthday_key >= start_key, Contact.birthday_key <= end_key)
+            )
+
+        # Birthdays after Dec 31 come after the ones earlier in the calendar.
+        stmt = stmt.order_by(
+            Contact.birthday_key < start_key, Contact.birthday_key, Contact.id
+        )
+        contacts = await self.db.execute(stmt.offset(skip).limit(limit))
+        return list(contacts.all())
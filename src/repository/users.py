@@ -1,4 +1,4 @@
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User
@@ -22,24 +22,27 @@ class UserRepository:
     async def create_user(
         self, body: UserCreate, avatar_url: str | None = None
     ) -> User:
-        new_user = User(
-            **body.model_dump(exclude_unset=True, exclude={"password"}),
-            password_hash=body.password,
-            avatar_url=avatar_url,
+        stmt = (
+            insert(User)
+            .values(
+                **body.model_dump(exclude_unset=True, exclude={"password"}),
+                password_hash=body.password,
+                avatar_url=avatar_url,
+            )
+            .returning(User)
         )
-        self.db.add(new_user)
+        new_user = await self.db.scalar(stmt)
         await self.db.commit()
-        await self.db.refresh(new_user)
         return new_user
 
     async def set_email_verified(self, user: User) -> User:
-        user.email_verified = True
-        await self.db.commit()
-        await self.db.refresh(user)
-        return user
+        return await self._update(user, email_verified=True)
 
     async def update_user_avatar(self, user: User, avatar_url: str) -> User:
-        user.avatar_url = avatar_url
+        return await self._update(user, avatar_url=avatar_url)
+
+    async def _update(self, user: User, **values) -> User:
+        stmt = update(User).where(User.id == user.id).values(**values).returning(User)
+        updated_user = await self.db.scalar(stmt)
         await self.db.commit()
-        await self.db.refresh(user)
-        return user
+        return updated_user
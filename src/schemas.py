@@ -1,21 +1,19 @@
 from datetime import date
-from typing import Optional
-from pydantic import BaseModel, Field, ConfigDict, EmailStr, field_validator
+from typing import List, Optional
+from pydantic import (
+    BaseModel,
+    Field,
+    ConfigDict,
+    EmailStr,
+    field_validator,
+    model_validator,
+)
 
-import phonenumbers
-from phonenumbers import NumberParseException
+from src.services.phones import phone_normalizer
 
 
 def validate_phone_number(phone: str) -> str:
-    try:
-        parsed = phonenumbers.parse(phone, None)
-
-        if not phonenumbers.is_valid_number(parsed):
-            raise ValueError("Invalid phone number")
-
-        return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
-    except NumberParseException:
-        raise ValueError("Invalid phone number format")
+    return phone_normalizer.normalize(phone)
 
 
 def validate_birthday(birthday: Optional[date]) -> Optional[date]:
@@ -62,6 +60,57 @@ class ContactUpdate(BaseModel):
         return validate_phone_number(v) if v is not None else v
 
 
+class ContactFilter(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+
+
+class ContactBulkChanges(BaseModel):
+    first_name: Optional[str] = Field(None, min_length=2, max_length=50)
+    last_name: Optional[str] = Field(None, min_length=2, max_length=50)
+    birthday: Optional[date] = None
+    additional_info: Optional[str] = None
+
+    @field_validator("first_name", "last_name")
+    @classmethod
+    def validate_not_null(cls, v: Optional[str]) -> str:
+        # Omitting a field leaves it alone; null would violate NOT NULL.
+        if v is None:
+            raise ValueError("must not be null")
+        return v
+
+    @field_validator("birthday")
+    @classmethod
+    def validate_birthday(cls, v: Optional[date]) -> Optional[date]:
+        return validate_birthday(v)
+
+
+class ContactBulkSelection(BaseModel):
+    ids: Optional[List[int]] = Field(None, min_length=1)
+    filter: Optional[ContactFilter] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Provide either ids or filter")
+        if self.filter is not None and not any(self.filter.model_dump().values()):
+            raise ValueError("Filter must set at least one field")
+        return self
+
+
+class ContactBulkUpdate(ContactBulkSelection):
+    changes: ContactBulkChanges
+
+
+class ContactBulkResult(BaseModel):
+    affected: List[int]
+    missing: List[int]
+    # The filter matched more than CONTACTS_BULK_MAX_ITEMS contacts and only
+    # that many, lowest ids first, were changed.
+    truncated: bool = False
+
+
 class ContactResponse(ContactModel):
     id: int
     model_config = ConfigDict(from_attributes=True)
@@ -76,6 +125,20 @@ class ContactShortResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ContactPageMeta(BaseModel):
+    total: int
+    exact: bool
+    page: int
+    show: int
+    pages: int
+    next_cursor: Optional[str] = None
+
+
+class ContactPage(BaseModel):
+    items: List[ContactShortResponse]
+    meta: ContactPageMeta
+
+
 class UserModel(BaseModel):
     id: int
     email: EmailStr
@@ -83,6 +146,12 @@ class UserModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserPrincipal(BaseModel):
+    id: int
+    email: str
+    model_config = ConfigDict(frozen=True)
+
+
 class UserCreate(BaseModel):
     email: EmailStr
     password: str = Field(min_length=6, max_length=72)
@@ -1,26 +1,26 @@
 from datetime import datetime, timedelta, UTC
 from typing import Literal
 
-from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 
 from src.database.models import User
-from src.database.db import get_db
-from src.conf.config import settings
+from src.database.db import PRIMARY_READS_COOKIE, get_db, sessionmanager
+from src.conf.config import get_settings
+from src.schemas import UserPrincipal
+from src.services.hashing import get_password_hasher
+from src.services.tokens import get_token_cache
 from src.services.users import UserService
 
 
 class Hash:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await get_password_hasher().verify(plain_password, hashed_password)
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return self.pwd_context.verify(plain_password, hashed_password)
-
-    def get_password_hash(self, password: str) -> str:
-        return self.pwd_context.hash(password)
+    async def get_password_hash(self, password: str) -> str:
+        return await get_password_hasher().hash(password)
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/signin")
@@ -29,6 +29,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/signin")
 def create_jwt_token(
     data: dict, expires_delta: timedelta, token_type: Literal["access", "refresh"]
 ) -> str:
+    settings = get_settings()
     to_encode = data.copy()
     now = datetime.now(tz=UTC)
     expire = now + expires_delta
@@ -42,6 +43,7 @@ def create_jwt_token(
 async def create_access_token(
     data: dict, expires_delta: timedelta | None = None
 ) -> str:
+    settings = get_settings()
     if expires_delta:
         access_token = create_jwt_token(data, expires_delta, "access")
     else:
@@ -56,6 +58,7 @@ async def create_access_token(
 async def create_refresh_token(
     data: dict, expires_delta: timedelta | None = None
 ) -> str:
+    settings = get_settings()
     if expires_delta:
         refresh_token = create_jwt_token(data, expires_delta, "refresh")
     else:
@@ -67,36 +70,83 @@ async def create_refresh_token(
     return refresh_token
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
-):
-    print("get_current_user: ", id(db))
+def token_claims(user: User) -> dict:
+    return {"sub": user.email, "uid": user.id}
+
+
+async def _authenticate(token: str, db: AsyncSession) -> User | UserPrincipal:
+    settings = get_settings()
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Unauthorized",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
-        )
+        payload = get_token_cache().decode(token)
         email = payload.get("sub")
         token_type = payload.get("token_type")
         if email is None or token_type != "access":
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    user_id = payload.get("uid")
+    if settings.AUTH_STATELESS_PRINCIPAL and isinstance(user_id, int):
+        return UserPrincipal.model_construct(id=user_id, email=email)
     user = await UserService(db).get_user_by_email(email)
     if user is None:
         raise credentials_exception
     return user
 
 
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+) -> User | UserPrincipal:
+    return await _authenticate(token, db)
+
+
+async def get_user_read_db(request: Request):
+    # Clients that committed a write moments ago carry the cookie set by
+    # ReadYourWritesMiddleware and keep reading from the primary.
+    readonly = PRIMARY_READS_COOKIE not in request.cookies
+    async with sessionmanager.session(readonly=readonly) as session:
+        yield session
+
+
+async def get_current_read_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_user_read_db)
+) -> User | UserPrincipal:
+    """Like get_current_user, but loads the user through the request's read
+    session so read-only routes never hold a primary connection."""
+    return await _authenticate(token, db)
+
+
+async def get_current_db_user(
+    user: User | UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    if isinstance(user, User):
+        return user
+    db_user = await UserService(db).get_user_by_id(user.id)
+    if db_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Unauthorized",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return db_user
+
+
+async def get_current_admin(
+    user: User | UserPrincipal = Depends(get_current_user),
+) -> User | UserPrincipal:
+    if user.email not in get_settings().ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return user
+
+
 async def verify_refresh_token(token: str, db: AsyncSession) -> User | None:
     try:
-        payload = jwt.decode(
-            token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
-        )
+        payload = get_token_cache().decode(token)
         email = payload.get("sub")
         if email is None or payload.get("token_type") != "refresh":
             return None
@@ -107,6 +157,7 @@ async def verify_refresh_token(token: str, db: AsyncSession) -> User | None:
 
 
 def create_eamil_token(data: dict) -> str:
+    settings = get_settings()
     to_encode = data.copy()
     expire = datetime.now(UTC) + timedelta(
         seconds=settings.VERIFICATION_TOKEN_EXPIRE_SECONDS
@@ -117,6 +168,7 @@ def create_eamil_token(data: dict) -> str:
 
 
 def get_email_from_token(token: str) -> str:
+    settings = get_settings()
     invalid_token_exception = HTTPException(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         detail="Invalid token",
@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import HTTPException, UploadFile, status
+
+from src.conf.config import get_settings
+from src.services.cloudinary import CloudinaryService
+from src.services.metrics import AVATAR_UPLOAD_DURATION, AVATAR_UPLOADS
+
+
+class AvatarService:
+    """Limits how many avatar uploads run at once on a shared backend."""
+
+    def __init__(self, backend: CloudinaryService, concurrency: int):
+        self.backend = backend
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def upload_file(self, file: UploadFile, user_id) -> str:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self._semaphore:
+                try:
+                    url = await self.backend.upload_file(file, user_id)
+                except httpx.HTTPError:
+                    raise HTTPException(
+                        status_code=status.HTTP_502_BAD_GATEWAY,
+                        detail="Could not upload avatar",
+                    )
+            outcome = "success"
+            return url
+        finally:
+            AVATAR_UPLOADS.labels(outcome=outcome).inc()
+            AVATAR_UPLOAD_DURATION.observe(time.perf_counter() - started)
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
+
+
+_avatar_service: AvatarService | None = None
+
+
+def get_avatar_service() -> AvatarService:
+    global _avatar_service
+    if _avatar_service is None:
+        settings = get_settings()
+        backend = CloudinaryService(
+            settings.CLOUDINARY_CLOUD_NAME,
+            settings.CLOUDINARY_API_KEY,
+            settings.CLOUDINARY_API_SECRET,
+            settings.AVATAR_UPLOAD_CHUNK_SIZE,
+            settings.AVATAR_UPLOAD_TIMEOUT,
+            settings.CLOUDINARY_API_URL,
+        )
+        _avatar_service = AvatarService(backend, settings.AVATAR_UPLOAD_CONCURRENCY)
+    return _avatar_service
+
+
+async def close_avatar_service() -> None:
+    global _avatar_service
+    if _avatar_service is not None:
+        await _avatar_service.aclose()
+        _avatar_service = None
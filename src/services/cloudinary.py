@@ -1,24 +1,87 @@
-import cloudinary
-import cloudinary.uploader
+import hashlib
+import re
+import time
+import uuid
+from pathlib import PurePath
+
+import httpx
+from fastapi import UploadFile
+
+UPLOAD_PATH = "/v1_1/{cloud_name}/image/upload"
+DELIVERY_URL = "https://res.cloudinary.com/{cloud_name}/image/upload"
+# Both end up in the multipart headers, so anything else is replaced.
+UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9._-]")
+CONTENT_TYPE = re.compile(r"^[A-Za-z0-9.+-]+/[A-Za-z0-9.+-]+$")
 
 
 class CloudinaryService:
-    def __init__(self, cloud_name, api_key, api_secret):
+    def __init__(
+        self,
+        cloud_name: str,
+        api_key: str,
+        api_secret: str,
+        chunk_size: int = 64 * 1024,
+        timeout: float = 30.0,
+        api_url: str = "https://api.cloudinary.com",
+    ):
         self.cloud_name = cloud_name
+        self.upload_url = api_url.rstrip("/") + UPLOAD_PATH.format(
+            cloud_name=cloud_name
+        )
         self.api_key = api_key
         self.api_secret = api_secret
-        cloudinary.config(
-            cloud_name=self.cloud_name,
-            api_key=self.api_key,
-            api_secret=self.api_secret,
-            secure=True,
-        )
+        self.chunk_size = chunk_size
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    def _sign(self, params: dict) -> str:
+        to_sign = "&".join(f"{key}={params[key]}" for key in sorted(params))
+        return hashlib.sha1((to_sign + self.api_secret).encode()).hexdigest()
 
-    @staticmethod
-    def upload_file(file, user_id) -> str:
+    async def upload_file(self, file: UploadFile, user_id) -> str:
         public_id = f"RestApp/{user_id}"
-        r = cloudinary.uploader.upload(file.file, public_id=public_id, overwrite=True)
-        src_url = cloudinary.CloudinaryImage(public_id).build_url(
-            width=250, height=250, crop="fill", version=r.get("version")
+        params = {
+            "overwrite": "true",
+            "public_id": public_id,
+            "timestamp": str(int(time.time())),
+        }
+        fields = {**params, "api_key": self.api_key, "signature": self._sign(params)}
+
+        boundary = uuid.uuid4().hex
+        head = b"".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n".encode()
+            for name, value in fields.items()
         )
-        return src_url
+        filename = UNSAFE_FILENAME.sub("_", PurePath(file.filename or "").name)
+        content_type = file.content_type or ""
+        if not CONTENT_TYPE.match(content_type):
+            content_type = "application/octet-stream"
+        head += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+            f'filename="{filename or "avatar"}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        tail = f"\r\n--{boundary}--\r\n".encode()
+
+        async def body():
+            yield head
+            while chunk := await file.read(self.chunk_size):
+                yield chunk
+            yield tail
+
+        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        if file.size is not None:
+            headers["Content-Length"] = str(len(head) + file.size + len(tail))
+
+        response = await self.client.post(
+            self.upload_url, content=body(), headers=headers
+        )
+        response.raise_for_status()
+        version = response.json().get("version")
+        return (
+            f"{DELIVERY_URL.format(cloud_name=self.cloud_name)}"
+            f"/c_fill,h_250,w_250/v{version}/{public_id}"
+        )
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,153 @@
+import codecs
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, List, Sequence
+
+from sqlalchemy import Row
+
+EXPORT_COLUMNS = (
+    "id",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "birthday",
+    "additional_info",
+    "created_at",
+    "updated_at",
+)
+
+
+class ImportTooLarge(ValueError):
+    """The upload, one of its lines or one of its records is over the limit."""
+
+
+async def iter_limited(
+    chunks: AsyncIterator[bytes], max_bytes: int
+) -> AsyncIterator[bytes]:
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            raise ImportTooLarge(f"Upload is larger than {max_bytes} bytes")
+        yield chunk
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_length: int
+) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if len(line) > max_length:
+                raise ImportTooLarge(f"Line is longer than {max_length} characters")
+            yield line.rstrip("\r")
+        if len(buffer) > max_length:
+            raise ImportTooLarge(f"Line is longer than {max_length} characters")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+def _ends_record(line: str, continued: bool) -> bool:
+    """Whether `line` completes a CSV record, by the csv module's own rules.
+
+    A continuation line starts inside a quoted field, which a leading quote
+    reproduces. The record is complete if the reader did not need the second
+    (empty) line to finish its row.
+    """
+    reader = csv.reader([f'"{line}' if continued else line, ""])
+    next(reader, None)
+    return reader.line_num <= 1
+
+
+async def iter_csv_records(
+    lines: AsyncIterator[str], max_length: int
+) -> AsyncIterator[dict | str]:
+    """Yield one dict per CSV row, keyed by the header row.
+
+    Quoted fields may span lines. Each line is checked once for whether it
+    ends the current record, and a record is parsed once it is complete.
+    Rows that cannot be parsed are yielded as an error message.
+    """
+
+    header = None
+    record: list[str] = []
+    length = 0
+    async for line in lines:
+        continued = bool(record)
+        record.append(line)
+        length += len(line) + 1
+        if length > max_length:
+            raise ImportTooLarge(f"Record is longer than {max_length} characters")
+        if not _ends_record(line, continued):
+            continue
+        text = "\n".join(record)
+        record, length = [], 0
+        if not text.strip():
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as e:
+            yield f"Invalid CSV: {e}"
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield {
+            name: value if value != "" else None
+            for name, value in zip(header, values)
+        }
+    if record:
+        yield "Unterminated quoted field"
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[dict | str]:
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield "Invalid JSON"
+            continue
+        yield record if isinstance(record, dict) else "Expected a JSON object"
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+async def format_csv(
+    columns: List[str], partitions: AsyncIterator[Sequence[Row]]
+) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    async for partition in partitions:
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def format_ndjson(
+    columns: List[str], partitions: AsyncIterator[Sequence[Row]]
+) -> AsyncIterator[str]:
+    async for partition in partitions:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+            for row in partition
+        )
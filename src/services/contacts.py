@@ -1,11 +1,81 @@
-from typing import List
-from datetime import date, timedelta
+import base64
+import binascii
+import json
+from typing import AsyncIterator, List
+from datetime import date, datetime, timedelta
 
+from pydantic import ValidationError
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf.config import get_settings
 from src.database.models import Contact, User
 from src.repository.contacts import ContactRepository
-from src.schemas import ContactModel, ContactUpdate
+from src.schemas import (
+    ContactBulkResult,
+    ContactBulkSelection,
+    ContactBulkUpdate,
+    ContactModel,
+    ContactUpdate,
+)
+from src.services.contact_files import format_csv, format_ndjson
+
+
+def encode_cursor(sort: str, descending: bool, contact: Contact | Row) -> str:
+    value = getattr(contact, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort, descending, value, contact.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+# Contact ids are int4 columns; larger values fail in the driver.
+INT4_MIN, INT4_MAX = -(2**31), 2**31 - 1
+
+
+def _is_int4(value) -> bool:
+    return (
+        isinstance(value, int)
+        and not isinstance(value, bool)
+        and INT4_MIN <= value <= INT4_MAX
+    )
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_descending, value, contact_id = json.loads(
+            base64.urlsafe_b64decode(padded)
+        )
+        if sort == "created_at":
+            value = datetime.fromisoformat(value)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or cursor_descending != descending:
+        raise ValueError("Cursor does not match the requested sort order")
+    if sort == "last_name" and not isinstance(value, str):
+        raise ValueError("Invalid cursor")
+    if sort == "id" and not _is_int4(value):
+        raise ValueError("Invalid cursor")
+    # created_at is stored without a time zone and cannot be compared to one.
+    if sort == "created_at" and value.tzinfo is not None:
+        raise ValueError("Invalid cursor")
+    if not _is_int4(contact_id):
+        raise ValueError("Invalid cursor")
+    return value, contact_id
+
+
+class ContactVersionMismatch(ValueError):
+    """The contact exists but no longer matches the version the client sent."""
+
+
+def _bulk_result(
+    body: ContactBulkSelection, affected: List[int], truncated: bool
+) -> ContactBulkResult:
+    missing = sorted(set(body.ids) - set(affected)) if body.ids else []
+    return ContactBulkResult(
+        affected=sorted(affected), missing=missing, truncated=truncated
+    )
 
 
 class ContactService:
@@ -13,28 +83,203 @@ class ContactService:
         self.contact_repository = ContactRepository(db)
 
     async def get_contacts(
-        self, user: User, page: int, show: int, filter: dict | None = None
-    ):
-        return await self.contact_repository.get_contacts(
-            user, skip=show * (page - 1), limit=show, filter=filter
+        self,
+        user: User,
+        page: int,
+        show: int,
+        filter: dict | None = None,
+        sort: str = "id",
+        descending: bool = False,
+        cursor: str | None = None,
+    ) -> tuple[List[Row], str | None]:
+        after = decode_cursor(cursor, sort, descending) if cursor else None
+        contacts = await self.contact_repository.get_contacts(
+            user,
+            skip=show * (page - 1),
+            limit=show + 1,
+            filter=filter,
+            sort=sort,
+            descending=descending,
+            after=after,
         )
+        if len(contacts) <= show:
+            return contacts, None
+        contacts = contacts[:show]
+        return contacts, encode_cursor(sort, descending, contacts[-1])
+
+    async def get_contact_versions(
+        self,
+        user: User,
+        page: int,
+        show: int,
+        filter: dict | None = None,
+        sort: str = "id",
+        descending: bool = False,
+        cursor: str | None = None,
+    ) -> List[Row]:
+        """(id, updated_at) of the rows `get_contacts` reads for the same
+        arguments, plus one more when a next page exists."""
+        after = decode_cursor(cursor, sort, descending) if cursor else None
+        return await self.contact_repository.get_contact_versions(
+            user,
+            skip=show * (page - 1),
+            limit=show + 1,
+            filter=filter,
+            sort=sort,
+            descending=descending,
+            after=after,
+        )
+
+    async def count_contacts(
+        self, user: User, filter: dict | None = None
+    ) -> tuple[int, bool]:
+        """Return (total, exact). Unfiltered totals come from the user's
+        counter; filtered ones are counted up to CONTACTS_COUNT_CAP."""
+        if not filter or not any(filter.values()):
+            return await self.contact_repository.get_contacts_count(user), True
+        cap = get_settings().CONTACTS_COUNT_CAP
+        total = await self.contact_repository.count_contacts(user, filter, cap)
+        return min(total, cap), total <= cap
+
+    async def search_contacts(self, user: User, query: str, limit: int) -> List[Row]:
+        return await self.contact_repository.search_contacts(user, query, limit)
 
     async def get_contact(self, user: User, contact_id: int):
         return await self.contact_repository.get_contact(user, contact_id)
 
+    async def get_contact_version(self, user: User, contact_id: int):
+        return await self.contact_repository.get_contact_version(user, contact_id)
+
     async def create_contact(self, user: User, contact: ContactModel):
         return await self.contact_repository.create_contact(user, contact)
 
-    async def update_contact(self, user: User, contact_id: int, contact: ContactUpdate):
-        return await self.contact_repository.update_contact(user, contact_id, contact)
+    async def import_contacts(
+        self, user: User, records: AsyncIterator[dict | str]
+    ) -> dict:
+        settings = get_settings()
+        report = {"inserted": 0, "skipped": 0, "failed": 0, "errors": []}
+
+        def add_error(row: int, errors: list[str]) -> None:
+            if len(report["errors"]) < settings.CONTACTS_IMPORT_MAX_ERRORS:
+                report["errors"].append({"row": row, "errors": errors})
+
+        async def flush(batch: list[tuple[int, dict]]) -> None:
+            inserted = await self.contact_repository.insert_contacts(
+                user, [values for _, values in batch]
+            )
+            for row, values in batch:
+                key = (values["email"], values["phone"])
+                if key in inserted:
+                    inserted.discard(key)
+                    report["inserted"] += 1
+                else:
+                    report["skipped"] += 1
+                    add_error(row, ["Contact with this email or phone already exists"])
+
+        batch = []
+        row = 0
+        async for record in records:
+            row += 1
+            if isinstance(record, str):
+                report["failed"] += 1
+                add_error(row, [record])
+                continue
+            try:
+                contact = ContactModel.model_validate(record)
+            except ValidationError as e:
+                report["failed"] += 1
+                add_error(
+                    row,
+                    [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()],
+                )
+                continue
+            batch.append((row, contact.model_dump()))
+            if len(batch) >= settings.CONTACTS_IMPORT_BATCH_SIZE:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+
+        report["errors_truncated"] = (
+            report["skipped"] + report["failed"] > len(report["errors"])
+        )
+        return report
+
+    def export_contacts(
+        self, user: User, columns: List[str], format: str
+    ) -> AsyncIterator[str]:
+        settings = get_settings()
+        partitions = self.contact_repository.stream_contacts(
+            user, columns, settings.CONTACTS_EXPORT_BATCH_SIZE
+        )
+        if format == "csv":
+            return format_csv(columns, partitions)
+        return format_ndjson(columns, partitions)
+
+    async def update_contact(
+        self,
+        user: User,
+        contact_id: int,
+        contact: ContactUpdate,
+        versions: List[datetime] | None = None,
+    ):
+        updated = await self.contact_repository.update_contact(
+            user, contact_id, contact, versions
+        )
+        if updated is None and versions is not None:
+            await self._check_version_mismatch(user, contact_id)
+        return updated
+
+    async def delete_contact(
+        self, user: User, contact_id: int, versions: List[datetime] | None = None
+    ):
+        deleted = await self.contact_repository.delete_contact(
+            user, contact_id, versions
+        )
+        if deleted is None and versions is not None:
+            await self._check_version_mismatch(user, contact_id)
+        return deleted
 
-    async def delete_contact(self, user: User, contact_id: int):
-        return await self.contact_repository.delete_contact(user, contact_id)
+    async def _check_version_mismatch(self, user: User, contact_id: int) -> None:
+        if await self.contact_repository.get_contact_version(user, contact_id):
+            raise ContactVersionMismatch("Contact has been modified")
+
+    async def bulk_update_contacts(
+        self, user: User, body: ContactBulkUpdate
+    ) -> ContactBulkResult:
+        settings = get_settings()
+        values = body.changes.model_dump(exclude_unset=True)
+        if not values:
+            raise ValueError("No changes provided")
+        affected, truncated = await self.contact_repository.bulk_update_contacts(
+            user,
+            values,
+            ids=body.ids,
+            filter=body.filter.model_dump() if body.filter else None,
+            limit=settings.CONTACTS_BULK_MAX_ITEMS,
+        )
+        return _bulk_result(body, affected, truncated)
+
+    async def bulk_delete_contacts(
+        self, user: User, body: ContactBulkSelection
+    ) -> ContactBulkResult:
+        settings = get_settings()
+        affected, truncated = await self.contact_repository.bulk_delete_contacts(
+            user,
+            ids=body.ids,
+            filter=body.filter.model_dump() if body.filter else None,
+            limit=settings.CONTACTS_BULK_MAX_ITEMS,
+        )
+        return _bulk_result(body, affected, truncated)
 
     async def get_upcoming_birthdays(
-        self, user: User, days_ahead: int = 7
-    ) -> List[Contact]:
+        self, user: User, days_ahead: int = 7, page: int = 1, show: int = 10
+    ) -> List[Row]:
         today = date.today()
         return await self.contact_repository.get_contacts_with_birthday_in_period(
-            user, today, today + timedelta(days=days_ahead)
+            user,
+            today,
+            today + timedelta(days=days_ahead),
+            skip=show * (page - 1),
+            limit=show,
         )
@@ -1,42 +1,213 @@
+import asyncio
+import logging
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
+from functools import cache
 from pathlib import Path
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
-from pydantic import EmailStr, NameEmail
+from pydantic import EmailStr
 
 from src.services.auth import create_eamil_token
-from src.conf.config import settings
-
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.SMTP_USER,
-    MAIL_PASSWORD=settings.SMTP_PASSWORD,
-    MAIL_FROM=settings.SMTP_FROM,
-    MAIL_PORT=settings.SMTP_PORT,
-    MAIL_SERVER=settings.SMTP_HOST,
-    MAIL_FROM_NAME=settings.SMTP_FROM_NAME,
-    MAIL_STARTTLS=settings.SMTP_STARTTLS,
-    MAIL_SSL_TLS=settings.SMTP_SSL_TLS,
-    USE_CREDENTIALS=settings.USE_CREDENTIALS,
-    VALIDATE_CERTS=settings.VALIDATE_CERTS,
-    TEMPLATE_FOLDER=Path(__file__).parent / "templates",
-)
+from src.conf.config import get_settings
+from src.services.metrics import EMAIL_QUEUE_DEPTH, EMAIL_SEND_DURATION, EMAILS
 
+logger = logging.getLogger(__name__)
 
-async def send_email(email: EmailStr, username: str, host: str) -> None:
-    try:
-        token_verification = create_eamil_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email",
-            recipients=[NameEmail(email=email, name=username)],
-            template_body={
-                "host": host,
-                "username": username,
-                "token": token_verification,
-            },
-            subtype=MessageType.html,
+TEMPLATE_FOLDER = Path(__file__).parent / "templates"
+
+
+@cache
+def get_template(name: str):
+    """Compile a template once per process."""
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+    environment = Environment(
+        loader=FileSystemLoader(TEMPLATE_FOLDER),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=False,
+    )
+    return environment.get_template(name)
+
+
+class MailDispatcher:
+    """Sends queued messages over a small pool of persistent SMTP connections.
+
+    Each worker owns one connection and drains up to `batch_size` messages
+    from the queue at a time, reconnecting and retrying with exponential
+    backoff when a send fails.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 2,
+        batch_size: int = 20,
+        queue_size: int = 1000,
+        max_attempts: int = 3,
+        retry_backoff: float = 1.0,
+    ):
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.queue: asyncio.Queue[EmailMessage] = asyncio.Queue(maxsize=queue_size)
+        self._workers: list[asyncio.Task] = []
+        self.sent = 0
+        self.failed = 0
+        # Queued or being sent.
+        self.pending = 0
+
+    def _connect_kwargs(self) -> dict:
+        settings = get_settings()
+        kwargs = {
+            "hostname": settings.SMTP_HOST,
+            "port": settings.SMTP_PORT,
+            "use_tls": settings.SMTP_SSL_TLS,
+            "start_tls": settings.SMTP_STARTTLS,
+            "validate_certs": settings.VALIDATE_CERTS,
+            "timeout": settings.MAIL_TIMEOUT,
+        }
+        if settings.USE_CREDENTIALS:
+            kwargs["username"] = settings.SMTP_USER
+            kwargs["password"] = settings.SMTP_PASSWORD.get_secret_value()
+        return kwargs
+
+    def start(self) -> None:
+        """Start the workers, replacing any that died, so the queue keeps
+        draining."""
+        alive = []
+        for worker in self._workers:
+            if not worker.done():
+                alive.append(worker)
+            elif not worker.cancelled() and worker.exception() is not None:
+                logger.error(
+                    "Mail worker %s died", worker.get_name(), exc_info=worker.exception()
+                )
+        self._workers = alive + [
+            asyncio.create_task(self._work(), name=f"mail-worker-{i}")
+            for i in range(len(alive), self.pool_size)
+        ]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Dropping %d unsent emails on shutdown", self.queue.qsize())
+            EMAILS.labels(outcome="dropped").inc(self.queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.pending = 0
+        EMAIL_QUEUE_DEPTH.set(0)
+
+    async def enqueue(self, message: EmailMessage) -> None:
+        self.start()
+        await self.queue.put(message)
+        self.pending += 1
+        EMAIL_QUEUE_DEPTH.set(self.pending)
+
+    async def _work(self) -> None:
+        import aiosmtplib
+
+        smtp = aiosmtplib.SMTP(**self._connect_kwargs())
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                while len(batch) < self.batch_size and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                for message in batch:
+                    try:
+                        await self._send(smtp, message)
+                    except Exception:
+                        # _send handles SMTP and network errors; anything else
+                        # (a malformed message, say) must not kill the worker.
+                        self.failed += 1
+                        EMAILS.labels(outcome="failed").inc()
+                        logger.exception("Failed to send email to %s", message["To"])
+                        smtp.close()
+                    finally:
+                        self.queue.task_done()
+                        self.pending -= 1
+                        EMAIL_QUEUE_DEPTH.set(self.pending)
+        finally:
+            if smtp.is_connected:
+                try:
+                    await smtp.quit()
+                except (aiosmtplib.SMTPException, OSError):
+                    smtp.close()
+
+    async def _send(self, smtp, message: EmailMessage) -> None:
+        import aiosmtplib
+
+        started = time.perf_counter()
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if not smtp.is_connected:
+                    await smtp.connect()
+                await smtp.send_message(message)
+                self.sent += 1
+                EMAILS.labels(outcome="sent").inc()
+                EMAIL_SEND_DURATION.observe(time.perf_counter() - started)
+                return
+            except (aiosmtplib.SMTPException, OSError) as e:
+                if smtp.is_connected:
+                    smtp.close()
+                if attempt == self.max_attempts:
+                    self.failed += 1
+                    EMAILS.labels(outcome="failed").inc()
+                    logger.error("Failed to send email to %s: %s", message["To"], e)
+                    return
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    def metrics(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "pending": self.pending,
+            "workers": len(self._workers),
+            "sent": self.sent,
+            "failed": self.failed,
+        }
+
+
+_mail_dispatcher: MailDispatcher | None = None
+
+
+def get_mail_dispatcher() -> MailDispatcher:
+    global _mail_dispatcher
+    if _mail_dispatcher is None:
+        settings = get_settings()
+        _mail_dispatcher = MailDispatcher(
+            pool_size=settings.MAIL_POOL_SIZE,
+            batch_size=settings.MAIL_BATCH_SIZE,
+            queue_size=settings.MAIL_QUEUE_SIZE,
+            max_attempts=settings.MAIL_MAX_ATTEMPTS,
+            retry_backoff=settings.MAIL_RETRY_BACKOFF,
         )
+    return _mail_dispatcher
 
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email-verification.html")
-    except ConnectionErrors as e:
-        print(f"Failed to send email to {email}: {e}")
+
+async def close_mail_dispatcher() -> None:
+    global _mail_dispatcher
+    if _mail_dispatcher is not None:
+        await _mail_dispatcher.stop(get_settings().MAIL_SHUTDOWN_TIMEOUT)
+        _mail_dispatcher = None
+
+
+def build_verification_email(email: str, username: str, host: str) -> EmailMessage:
+    settings = get_settings()
+    html = get_template("email-verification.html").render(
+        host=host, username=username, token=create_eamil_token({"sub": email})
+    )
+    message = EmailMessage()
+    message["Subject"] = "Confirm your email"
+    message["From"] = formataddr((settings.SMTP_FROM_NAME, settings.SMTP_FROM))
+    message["To"] = formataddr((username, email))
+    message.set_content(html, subtype="html")
+    return message
+
+
+async def send_email(email: EmailStr, username: str, host: str) -> None:
+    await get_mail_dispatcher().enqueue(build_verification_email(email, username, host))
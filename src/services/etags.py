@@ -0,0 +1,61 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Iterable, List
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _microseconds(updated_at: datetime) -> int:
+    return (updated_at.replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1)
+
+
+def contact_etag(contact_id: int, updated_at: datetime) -> str:
+    """Strong ETag of a single contact: ``"<id>-<updated_at in µs>"``."""
+    return f'"{contact_id}-{_microseconds(updated_at)}"'
+
+
+def page_etag(
+    versions: Iterable[tuple[int, datetime]],
+    has_next: bool,
+    total: int | None = None,
+) -> str:
+    """Strong ETag of a list page from the (id, updated_at) of its rows,
+    whether another page follows it and the total count, if one is sent."""
+    digest = hashlib.blake2b(b"+" if has_next else b"-", digest_size=12)
+    if total is not None:
+        digest.update(b"%d;" % total)
+    for contact_id, updated_at in versions:
+        digest.update(b"%d-%d;" % (contact_id, _microseconds(updated_at)))
+    return f'"l-{digest.hexdigest()}"'
+
+
+def parse_etags(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def if_none_match(header: str | None, etag: str) -> bool:
+    """True when ``If-None-Match`` matches, i.e. the client copy is current.
+    Uses the weak comparison RFC 9110 prescribes for this header."""
+    if not header:
+        return False
+    tags = parse_etags(header)
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def if_match_versions(header: str | None, contact_id: int) -> List[datetime] | None:
+    """The ``updated_at`` values an ``If-Match`` header allows for a contact.
+
+    ``None`` means any version is acceptable (no header or ``*``). Weak and
+    foreign ETags never match, so they produce an empty list.
+    """
+    if not header:
+        return None
+    tags = parse_etags(header)
+    if "*" in tags:
+        return None
+    versions = []
+    for tag in tags:
+        tag_id, _, microseconds = tag.strip('"').partition("-")
+        if tag.startswith('"') and tag_id == str(contact_id) and microseconds.isdigit():
+            versions.append(EPOCH + timedelta(microseconds=int(microseconds)))
+    return versions
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cache
+
+from fastapi import HTTPException, status
+
+from src.conf.config import get_settings
+from src.services.instrumentation import record
+from src.services.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_REJECTED
+
+
+@cache
+def _pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def _hash(password: str) -> str:
+    return _pwd_context().hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return _pwd_context().verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a worker pool so it never blocks the event loop.
+
+    At most `max_pending` operations may be queued or running at once; any
+    request beyond that is rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, executor: str, workers: int, max_pending: int):
+        self.executor_type = executor
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Executor | None = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.total_hash_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            PASSWORD_HASH_REJECTED.labels(operation=operation).inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again later.",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            result, hash_seconds = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), _timed, func, *args
+            )
+        finally:
+            self.pending -= 1
+        elapsed = time.perf_counter() - started
+        record("hash", elapsed)
+        PASSWORD_HASH_DURATION.labels(operation=operation).observe(elapsed)
+        self.completed += 1
+        self.total_seconds += elapsed
+        self.total_hash_seconds += hash_seconds
+        self.max_seconds = max(self.max_seconds, elapsed)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", _hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", _verify, plain_password, hashed_password)
+
+    def metrics(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": min(self.pending, self.workers),
+            "queue_depth": max(self.pending - self.workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_latency_seconds": self.total_seconds / completed,
+            "avg_hash_seconds": self.total_hash_seconds / completed,
+            "max_latency_seconds": self.max_seconds,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_password_hasher: PasswordHasher | None = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _password_hasher
+    if _password_hasher is None:
+        settings = get_settings()
+        _password_hasher = PasswordHasher(
+            settings.PASSWORD_HASH_EXECUTOR,
+            settings.PASSWORD_HASH_WORKERS,
+            settings.PASSWORD_HASH_MAX_PENDING,
+        )
+    return _password_hasher
+
+
+def shutdown_password_hasher() -> None:
+    global _password_hasher
+    if _password_hasher is not None:
+        _password_hasher.shutdown()
+        _password_hasher = None
@@ -0,0 +1,168 @@
+import contextlib
+import json
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger("src.requests")
+
+SLOWEST_SQL_LENGTH = 200
+
+
+@dataclass
+class RequestMetrics:
+    """What one request spent its time on. Times are in seconds."""
+
+    started: float
+    db_count: int = 0
+    db_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_sql: str | None = None
+    pool_wait: float = 0.0
+    timings: dict[str, float] = field(default_factory=dict)
+
+    def server_timing(self) -> str:
+        total = time.perf_counter() - self.started
+        parts = [f'db;dur={self.db_time * 1000:.2f};desc="{self.db_count} queries"']
+        if self.db_count:
+            parts.append(f"db-slowest;dur={self.slowest_time * 1000:.2f}")
+        if self.pool_wait:
+            parts.append(f"db-pool;dur={self.pool_wait * 1000:.2f}")
+        parts += [f"{name};dur={t * 1000:.2f}" for name, t in self.timings.items()]
+        parts.append(f"app;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar(
+    "request_metrics", default=None
+)
+_enabled = True
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def record(name: str, seconds: float) -> None:
+    """Add time spent on `name` (e.g. "hash", "jwt") to the current request."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.timings[name] = metrics.timings.get(name, 0.0) + seconds
+
+
+def record_pool_wait(seconds: float) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.pool_wait += seconds
+
+
+@contextlib.contextmanager
+def measure() -> Iterator[RequestMetrics]:
+    """Collect metrics for the code run inside the block, as
+    RequestInstrumentationMiddleware does for a request."""
+    metrics = RequestMetrics(started=time.perf_counter())
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._instrumentation_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current.get()
+    started = getattr(context, "_instrumentation_started", None)
+    if metrics is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    metrics.db_count += 1
+    metrics.db_time += elapsed
+    if elapsed > metrics.slowest_time:
+        metrics.slowest_time = elapsed
+        metrics.slowest_sql = statement
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RequestInstrumentationMiddleware:
+    """Collects per-request DB, pool, bcrypt and JWT timings.
+
+    They are logged as one JSON line on the "src.requests" logger once the
+    response is complete and, with `server_timing`, sent back in a
+    Server-Timing header, except under `private_paths`: timings of sign-in
+    and sign-up would tell whether an account exists. While disabled (see
+    set_enabled) requests pass through untouched.
+    """
+
+    def __init__(self, app, server_timing: bool = False, private_paths=()):
+        self.app = app
+        self.server_timing = server_timing
+        self.private_paths = tuple(private_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _enabled:
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics(started=time.perf_counter())
+        token = _current.set(metrics)
+        status = None
+        server_timing = self.server_timing and not scope["path"].startswith(
+            self.private_paths
+        )
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if server_timing:
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", metrics.server_timing()
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(_log_line(scope, status, metrics))
+
+
+def _log_line(scope, status: int | None, metrics: RequestMetrics) -> str:
+    slowest_sql = metrics.slowest_sql
+    if slowest_sql and len(slowest_sql) > SLOWEST_SQL_LENGTH:
+        slowest_sql = slowest_sql[:SLOWEST_SQL_LENGTH] + "..."
+    return json.dumps(
+        {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": round((time.perf_counter() - metrics.started) * 1000, 2),
+            "db_count": metrics.db_count,
+            "db_ms": round(metrics.db_time * 1000, 2),
+            "db_slowest_ms": round(metrics.slowest_time * 1000, 2),
+            "db_slowest_sql": slowest_sql,
+            "db_pool_wait_ms": round(metrics.pool_wait * 1000, 2),
+            **{f"{k}_ms": round(v * 1000, 2) for k, v in metrics.timings.items()},
+        },
+        separators=(",", ":"),
+    )
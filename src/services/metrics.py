@@ -0,0 +1,177 @@
+"""Prometheus metrics, served on /metrics by prometheus_client.
+
+With several uvicorn workers, start the server with the environment variable
+PROMETHEUS_MULTIPROC_DIR pointing at a directory shared by the workers and
+emptied on every deploy. prometheus_client then keeps each worker's values in
+files there, and a scrape, whichever worker serves it, aggregates them:
+counters and histograms over every worker that ran, gauges over the live
+ones (workers call mark_process_dead when they shut down).
+"""
+
+import asyncio
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.responses import Response
+
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+HASH_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0)
+# Anything else a client sends is labelled "other".
+HTTP_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE")
+)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status.",
+    ("method", "route", "status"),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served.",
+    ("method",),
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured connections in the pool.",
+    ("pool",),
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections in use.",
+    ("pool",),
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_IN = Gauge(
+    "db_pool_checked_in",
+    "Idle connections in the pool.",
+    ("pool",),
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections opened beyond the pool size.",
+    ("pool",),
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check out a connection.",
+    buckets=FAST_BUCKETS + (0.25, 0.5, 1.0, 2.5, 5.0),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Password hashing and verification latency, including queueing.",
+    ("operation",),
+    buckets=HASH_BUCKETS,
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Hashing requests turned away because too many were pending.",
+    ("operation",),
+)
+JWT_VERIFICATIONS = Counter(
+    "jwt_verifications_total",
+    "Access token verifications by result (hit, miss, uncached, invalid).",
+    ("result",),
+)
+JWT_VERIFICATION_DURATION = Histogram(
+    "jwt_verification_duration_seconds",
+    "Access token verification latency.",
+    buckets=FAST_BUCKETS,
+)
+AVATAR_UPLOADS = Counter(
+    "avatar_uploads_total",
+    "Avatar uploads by outcome.",
+    ("outcome",),
+)
+AVATAR_UPLOAD_DURATION = Histogram(
+    "avatar_upload_duration_seconds",
+    "Avatar upload latency, including waiting for an upload slot.",
+)
+EMAILS = Counter(
+    "emails_total", "Emails by outcome (sent, failed, dropped).", ("outcome",)
+)
+EMAIL_QUEUE_DEPTH = Gauge(
+    "email_queue_depth",
+    "Emails queued and not yet sent.",
+    multiprocess_mode="livesum",
+)
+EMAIL_SEND_DURATION = Histogram(
+    "email_send_duration_seconds",
+    "Time to deliver one email to the SMTP server, including retries.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+
+def _multiprocess() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render() -> bytes:
+    if not _multiprocess():
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+async def metrics_endpoint(request) -> Response:
+    return Response(await asyncio.to_thread(render), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's gauges from the shared directory; call on shutdown."""
+    if _multiprocess():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """Observes request latency per route template and in-flight requests.
+
+    The route template (e.g. /api/contacts/{contact_id}) is only known once
+    routing has happened, so it is read from the scope after the response.
+    Requests that match no route are labelled "unmatched", and non-standard
+    methods "other", to keep the number of label values bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in HTTP_METHODS else "other"
+        started = time.perf_counter()
+        status = 500
+        in_progress = REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_DURATION.labels(method=method, route=route, status=status).observe(
+                time.perf_counter() - started
+            )
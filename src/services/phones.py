@@ -0,0 +1,50 @@
+from functools import lru_cache
+from typing import NamedTuple
+
+
+class PhoneResult(NamedTuple):
+    phone: str | None
+    error: str | None = None
+
+
+def _normalize(phone: str) -> PhoneResult:
+    # Imported here: phonenumbers is slow to import and only needed once a
+    # phone number is actually validated.
+    import phonenumbers
+    from phonenumbers import NumberParseException
+
+    try:
+        parsed = phonenumbers.parse(phone, None)
+    except NumberParseException:
+        return PhoneResult(None, "Invalid phone number format")
+    if not phonenumbers.is_valid_number(parsed):
+        return PhoneResult(None, "Invalid phone number")
+    return PhoneResult(
+        phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+    )
+
+
+class PhoneNormalizer:
+    """Normalizes phone numbers to E.164, memoizing results per raw input."""
+
+    def __init__(self, cache_size: int = 4096):
+        self._cached_normalize = lru_cache(maxsize=cache_size)(_normalize)
+
+    def normalize(self, phone: str) -> str:
+        result = self._cached_normalize(phone)
+        if result.error:
+            raise ValueError(result.error)
+        return result.phone
+
+    @staticmethod
+    def preload() -> None:
+        """Load metadata for every region now instead of on first use."""
+        from phonenumbers import PhoneMetadata
+
+        PhoneMetadata.load_all()
+
+    def cache_info(self):
+        return self._cached_normalize.cache_info()
+
+
+phone_normalizer = PhoneNormalizer()
@@ -0,0 +1,293 @@
+import fcntl
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from typing import NamedTuple, Protocol
+
+from fastapi import Depends, HTTPException, Request, status
+
+from src.conf.config import RateLimit, get_settings
+from src.schemas import UserPrincipal
+from src.database.models import User
+from src.services.auth import get_current_user
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitUnavailable(Exception):
+    """The backend could not count a hit."""
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: int
+
+
+class RateLimitBackend(Protocol):
+    async def hit(self, key: str, window: int, window_id: int) -> tuple[int, int]:
+        """Count a hit in ``window_id`` and return (current, previous) counts.
+
+        Raises RateLimitUnavailable when the hit cannot be counted.
+        """
+
+    async def close(self) -> None: ...
+
+
+class MemoryBackend:
+    """Counters local to this process."""
+
+    def __init__(self):
+        self._counters: dict[str, tuple[int, int, int, int]] = {}
+
+    async def hit(self, key: str, window: int, window_id: int) -> tuple[int, int]:
+        stored_id, _, current, previous = self._counters.get(
+            key, (window_id, window, 0, 0)
+        )
+        if stored_id != window_id:
+            previous = current if stored_id == window_id - 1 else 0
+            current = 0
+        current += 1
+        self._counters[key] = (window_id, window, current, previous)
+        if len(self._counters) > 100_000:
+            # Keys have different windows, so compare when they expire.
+            now = window_id * window
+            self._counters = {
+                k: v for k, v in self._counters.items() if _expires(v[0], v[1]) > now
+            }
+        return current, previous
+
+    async def close(self) -> None:
+        self._counters.clear()
+
+
+def _expires(window_id: int, window: int) -> int:
+    """When a counter stops mattering: once the window after it has ended,
+    it is no longer anyone's previous window."""
+    return (window_id + 2) * window
+
+
+class SharedMemoryBackend:
+    """Counters in a memory-mapped file shared by the workers on one host.
+
+    The file is an open-addressing table of fixed-size slots. Every update
+    runs under an ``fcntl`` lock on the file, which only guards a few memory
+    reads and writes, so it is held for microseconds. A slot is only reused
+    once its counter has expired; when every probed slot is live the hit
+    raises RateLimitUnavailable.
+    """
+
+    # Key hash, window id, window length, current and previous count.
+    SLOT = struct.Struct("<QqIII")
+    PROBES = 8
+
+    def __init__(self, path: str, slots: int = 65536):
+        self.path = path
+        self.slots = slots
+        size = slots * self.SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != size:
+                # Left by a different slot count or layout: start empty.
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # 0 marks an empty slot.
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    async def hit(self, key: str, window: int, window_id: int) -> tuple[int, int]:
+        key_hash = self._hash(key)
+        start = key_hash % self.slots
+        # The start of the current window, so never later than the real time.
+        now = window_id * window
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            target = free = None
+            for i in range(self.PROBES):
+                offset = ((start + i) % self.slots) * self.SLOT.size
+                slot_hash, slot_id, slot_window, current, previous = (
+                    self.SLOT.unpack_from(self._map, offset)
+                )
+                if slot_hash == key_hash:
+                    target = offset
+                    break
+                if free is None and (
+                    slot_hash == 0 or _expires(slot_id, slot_window) <= now
+                ):
+                    free = offset
+            if target is None:
+                if free is None:
+                    raise RateLimitUnavailable(f"No free slot in {self.path}")
+                target = free
+                slot_id, current, previous = window_id, 0, 0
+            if slot_id != window_id:
+                previous = current if slot_id == window_id - 1 else 0
+                current = 0
+            current += 1
+            self.SLOT.pack_into(
+                self._map, target, key_hash, window_id, window, current, previous
+            )
+            return current, previous
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    async def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+class RedisBackend:
+    """Counters in Redis, shared by every instance.
+
+    Each hit is one pipelined round trip: INCR and EXPIRE on the current
+    window's key plus GET on the previous one.
+    """
+
+    def __init__(self, url: str, timeout: float = 1.0):
+        from redis.asyncio import Redis
+        from redis.asyncio.retry import Retry
+        from redis.backoff import NoBackoff
+
+        self._redis = Redis.from_url(
+            url,
+            socket_timeout=timeout,
+            socket_connect_timeout=timeout,
+            # Reconnect once, then give up; a down Redis must not stall requests.
+            retry=Retry(NoBackoff(), 1),
+        )
+
+    async def hit(self, key: str, window: int, window_id: int) -> tuple[int, int]:
+        from redis.exceptions import RedisError
+
+        current_key = f"ratelimit:{key}:{window_id}"
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.incr(current_key)
+        pipe.expire(current_key, window * 2)
+        pipe.get(f"ratelimit:{key}:{window_id - 1}")
+        try:
+            current, _, previous = await pipe.execute()
+        except (RedisError, OSError) as e:
+            raise RateLimitUnavailable(f"Redis: {e}") from e
+        return current, int(previous or 0)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class RateLimiter:
+    """Sliding-window counter limiter.
+
+    Counts are kept per fixed window; the previous window's count is weighted
+    by how much of it still overlaps the sliding window ending now.
+    """
+
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+
+    async def hit(
+        self, key: str, rate: RateLimit, now: float | None = None
+    ) -> RateLimitResult:
+        now = time.time() if now is None else now
+        window_id, elapsed = divmod(now, rate.window)
+        current, previous = await self.backend.hit(key, rate.window, int(window_id))
+        weight = 1 - elapsed / rate.window
+        count = previous * weight + current
+        if count <= rate.limit:
+            return RateLimitResult(True, int(rate.limit - count), 0)
+        if current <= rate.limit:
+            # Wait until enough of the previous window has slid out.
+            until = rate.window * (1 - (rate.limit - current) / previous)
+            retry_after = until - elapsed
+        else:
+            # The current window alone is over the limit: wait into the next.
+            until = rate.window * (1 - (rate.limit - 1) / current)
+            retry_after = rate.window - elapsed + until
+        return RateLimitResult(False, 0, max(1, math.ceil(retry_after)))
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+_rate_limiter: RateLimiter | None = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        settings = get_settings()
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            backend = RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+        elif settings.RATE_LIMIT_BACKEND == "shared":
+            backend = SharedMemoryBackend(
+                settings.RATE_LIMIT_SHARED_PATH, settings.RATE_LIMIT_SHARED_SLOTS
+            )
+        else:
+            backend = MemoryBackend()
+        _rate_limiter = RateLimiter(backend)
+    return _rate_limiter
+
+
+async def close_rate_limiter() -> None:
+    global _rate_limiter
+    if _rate_limiter is not None:
+        await _rate_limiter.close()
+        _rate_limiter = None
+
+
+async def _enforce(route: str, setting: str, key: str) -> None:
+    settings = get_settings()
+    limit = getattr(settings, setting)
+    if not settings.RATE_LIMIT_ENABLED or limit is None:
+        return
+    try:
+        result = await get_rate_limiter().hit(f"{route}:{key}", limit)
+    except RateLimitUnavailable as e:
+        if settings.RATE_LIMIT_FAIL_OPEN:
+            logger.warning("Rate limiter unavailable, not limiting %s: %s", route, e)
+            return
+        logger.error("Rate limiter unavailable, rejecting %s: %s", route, e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service temporarily unavailable. Please try again later.",
+        )
+    if not result.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded. Please try again later.",
+            headers={"Retry-After": str(result.retry_after)},
+        )
+
+
+def client_address(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit(route: str, setting: str):
+    """Dependency limiting a public route per client address."""
+
+    async def dependency(request: Request) -> None:
+        await _enforce(route, setting, f"ip:{client_address(request)}")
+
+    return Depends(dependency)
+
+
+def user_rate_limit(route: str, setting: str):
+    """Dependency limiting an authenticated route per user."""
+
+    async def dependency(
+        user: User | UserPrincipal = Depends(get_current_user),
+    ) -> None:
+        await _enforce(route, setting, f"user:{user.id}")
+
+    return Depends(dependency)
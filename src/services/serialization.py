@@ -0,0 +1,22 @@
+from typing import Any, Iterable, List
+
+from fastapi.responses import JSONResponse
+import orjson
+from pydantic import BaseModel
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+def trusted_rows(model: type[BaseModel], objects: Iterable[Any]) -> List[dict]:
+    """Plain dicts with the fields of `model` read from `objects`.
+
+    Nothing is validated: use it only for data the application wrote and
+    validated itself, such as rows loaded from the database.
+    """
+    fields = tuple(model.model_fields)
+    return [{field: getattr(obj, field) for field in fields} for obj in objects]
@@ -0,0 +1,104 @@
+import hashlib
+import hmac
+import time
+from collections import OrderedDict
+
+from jose import jwt
+
+from src.conf.config import get_settings
+from src.services.instrumentation import record
+from src.services.metrics import JWT_VERIFICATION_DURATION, JWT_VERIFICATIONS
+
+
+class TokenCache:
+    """Bounded LRU of verified JWT payloads, each dropped at its ``exp``.
+
+    Only tokens that passed ``jwt.decode`` are stored, so a cache hit never
+    skips verification of a token that would have failed it. Entries are keyed
+    by an HMAC of the token under the signing secret, so neither the tokens
+    nor their digests are usable outside this process.
+    """
+
+    def __init__(self, secret: str, algorithm: str, maxsize: int = 4096):
+        self.secret = secret
+        self.algorithm = algorithm
+        self.maxsize = maxsize
+        self._key = hashlib.sha256(f"{algorithm}:{secret}".encode()).digest()
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _digest(self, token: str) -> bytes:
+        return hmac.digest(self._key, token.encode(), "blake2b")
+
+    def decode(self, token: str) -> dict:
+        """Return the token payload, raising ``JWTError`` like ``jwt.decode``."""
+        started = time.perf_counter()
+        result = "invalid"
+        try:
+            result, payload = self._decode(token)
+            return payload
+        finally:
+            elapsed = time.perf_counter() - started
+            record("jwt", elapsed)
+            JWT_VERIFICATIONS.labels(result=result).inc()
+            JWT_VERIFICATION_DURATION.observe(elapsed)
+
+    def _decode(self, token: str) -> tuple[str, dict]:
+        """Return how the token was verified ("hit", "miss", "uncached") and
+        its payload."""
+        if self.maxsize <= 0:
+            payload = jwt.decode(token, self.secret, algorithms=[self.algorithm])
+            return "uncached", payload
+        digest = self._digest(token)
+        entry = self._entries.get(digest)
+        if entry is not None:
+            expires_at, payload = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return "hit", dict(payload)
+            del self._entries[digest]
+        self.misses += 1
+        payload = jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        expires_at = payload.get("exp")
+        if isinstance(expires_at, (int, float)):
+            self._entries[digest] = (expires_at, payload)
+            if len(self._entries) > self.maxsize:
+                self._evict()
+        return "miss", dict(payload)
+
+    def _evict(self) -> None:
+        now = time.time()
+        for digest in [d for d, (exp, _) in self._entries.items() if exp <= now]:
+            del self._entries[digest]
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_token_cache: TokenCache | None = None
+
+
+def get_token_cache() -> TokenCache:
+    global _token_cache
+    settings = get_settings()
+    if (
+        _token_cache is None
+        or _token_cache.secret != settings.JWT_SECRET
+        or _token_cache.algorithm != settings.JWT_ALGORITHM
+    ):
+        _token_cache = TokenCache(
+            settings.JWT_SECRET, settings.JWT_ALGORITHM, settings.JWT_CACHE_SIZE
+        )
+    return _token_cache
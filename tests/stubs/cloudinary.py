@@ -0,0 +1,139 @@
+"""Minimal in-process HTTP server standing in for Cloudinary's upload API.
+It checks request signatures like Cloudinary does and keeps uploads in memory.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from email import message_from_bytes, policy
+
+UPLOAD_PATH = re.compile(r"^/v1_1/(?P<cloud_name>[^/]+)/image/upload$")
+
+
+class CloudinaryStub:
+    def __init__(
+        self,
+        api_secret: str,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        delay: float = 0.0,
+    ):
+        self.api_secret = api_secret
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.uploads: list[dict] = []
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+        self._server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "CloudinaryStub":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while request_line := await reader.readline():
+                _, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await self._read_body(reader, headers)
+                status, payload = await self._upload(path, headers, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_body(reader: asyncio.StreamReader, headers: dict) -> bytes:
+        if "content-length" in headers:
+            return await reader.readexactly(int(headers["content-length"]))
+        if headers.get("transfer-encoding", "").lower() != "chunked":
+            return b""
+        body = bytearray()
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            body += await reader.readexactly(size)
+            await reader.readline()
+        await reader.readline()
+        return bytes(body)
+
+    async def _upload(self, path: str, headers: dict, body: bytes) -> tuple[str, dict]:
+        match = UPLOAD_PATH.match(path)
+        if match is None:
+            return "404 Not Found", {"error": {"message": "Not found"}}
+        message = message_from_bytes(
+            f"Content-Type: {headers.get('content-type', '')}\r\n\r\n".encode() + body,
+            policy=policy.HTTP,
+        )
+        fields, upload = {}, None
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                upload = part
+            else:
+                fields[name] = part.get_content().strip()
+        if upload is None:
+            return "400 Bad Request", {"error": {"message": "Missing file"}}
+
+        signature = fields.pop("signature", "")
+        fields.pop("api_key", None)
+        to_sign = "&".join(f"{key}={fields[key]}" for key in sorted(fields))
+        expected = hashlib.sha1((to_sign + self.api_secret).encode()).hexdigest()
+        if signature != expected:
+            return "401 Unauthorized", {"error": {"message": "Invalid Signature"}}
+
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        data = upload.get_payload(decode=True) or b""
+        version = int(time.time())
+        self.uploads.append(
+            {
+                "cloud_name": match["cloud_name"],
+                "public_id": fields.get("public_id"),
+                "filename": upload.get_filename(),
+                "content_type": upload.get_content_type(),
+                "data": data,
+            }
+        )
+        return "200 OK", {
+            "public_id": fields.get("public_id"),
+            "version": version,
+            "bytes": len(data),
+            "secure_url": f"{self.url}/{match['cloud_name']}/image/upload"
+            f"/v{version}/{fields.get('public_id')}",
+        }
+
@@ -0,0 +1,105 @@
+"""Minimal in-process server speaking the Redis protocol, standing in for
+Redis. It implements only the commands the rate limiter uses.
+"""
+
+import asyncio
+import time
+
+
+class RedisStub:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.data: dict[str, tuple[str, float | None]] = {}
+        self.connections = 0
+        self.commands = 0
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "RedisStub":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def _get(self, key: str) -> str | None:
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _execute(self, command: str, args: list[str], proto: int) -> bytes:
+        if command in ("PING", "AUTH", "SELECT", "CLIENT"):
+            return b"+OK\r\n" if command != "PING" else b"+PONG\r\n"
+        if command == "HELLO":
+            return b"%%1\r\n+proto\r\n:%d\r\n" % proto
+        if command == "GET":
+            value = self._get(args[0])
+            if value is None:
+                return b"_\r\n" if proto == 3 else b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value.encode())
+        if command in ("INCR", "INCRBY"):
+            value = int(self._get(args[0]) or 0) + (int(args[1]) if args[1:] else 1)
+            expires_at = self.data.get(args[0], (None, None))[1]
+            self.data[args[0]] = (str(value), expires_at)
+            return b":%d\r\n" % value
+        if command == "EXPIRE":
+            if self._get(args[0]) is None:
+                return b":0\r\n"
+            self.data[args[0]] = (
+                self.data[args[0]][0],
+                time.monotonic() + int(args[1]),
+            )
+            return b":1\r\n"
+        if command == "DEL":
+            return b":%d\r\n" % sum(self.data.pop(k, None) is not None for k in args)
+        if command == "FLUSHALL":
+            self.data.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command.encode()
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> list[str] | None:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.decode().split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2].decode())
+        return args
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        # RESP version, switched by HELLO; redis-py asks for 3.
+        proto = 2
+        try:
+            while (args := await self._read_command(reader)) is not None:
+                if not args:
+                    continue
+                self.commands += 1
+                command = args[0].upper()
+                if command == "QUIT":
+                    writer.write(b"+OK\r\n")
+                    break
+                if command == "HELLO" and args[1:]:
+                    proto = int(args[1])
+                writer.write(self._execute(command, args[1:], proto))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
@@ -0,0 +1,68 @@
+"""Minimal in-process SMTP server standing in for a real one. It accepts any
+credentials and keeps messages in memory.
+"""
+
+import asyncio
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+
+
+class SMTPStub:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.messages: list[EmailMessage] = []
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "SMTPStub":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+
+        async def reply(line: str) -> None:
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        await reply("220 localhost SMTP stub ready")
+        try:
+            while line := await reader.readline():
+                command = line.decode(errors="replace").strip().split(" ", 1)[0].upper()
+                if command in ("EHLO", "HELO"):
+                    await reply("250-localhost\r\n250-AUTH PLAIN\r\n250 8BITMIME")
+                elif command == "AUTH":
+                    await reply("235 2.7.0 Authentication successful")
+                elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                    await reply("250 OK")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = bytearray()
+                    while (chunk := await reader.readline()) not in (b".\r\n", b""):
+                        data += chunk[1:] if chunk.startswith(b"..") else chunk
+                    self.messages.append(
+                        message_from_bytes(bytes(data), policy=policy.default)
+                    )
+                    await reply("250 OK: queued")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        finally:
+            writer.close()
+
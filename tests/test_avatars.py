@@ -0,0 +1,105 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from src.services.avatars import AvatarService
+from src.services.cloudinary import CloudinaryService
+from tests.stubs.cloudinary import CloudinaryStub
+
+
+def upload(data: bytes, filename: str, content_type: str = "image/png") -> UploadFile:
+    return UploadFile(
+        io.BytesIO(data),
+        size=len(data),
+        filename=filename,
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+def avatar_service(stub: CloudinaryStub, api_secret: str = "secret", concurrency=2):
+    backend = CloudinaryService(
+        "demo", "key", api_secret, chunk_size=1024, api_url=stub.url
+    )
+    return AvatarService(backend, concurrency)
+
+
+def test_uploads_are_signed_and_reach_cloudinary():
+    async def scenario():
+        async with CloudinaryStub("secret") as stub:
+            service = avatar_service(stub)
+            try:
+                url = await service.upload_file(upload(b"x" * 5000, "me.png"), 7)
+            finally:
+                await service.aclose()
+            return stub, url
+
+    stub, url = asyncio.run(scenario())
+    [received] = stub.uploads
+    assert received["cloud_name"] == "demo"
+    assert received["public_id"] == "RestApp/7"
+    assert received["filename"] == "me.png"
+    assert received["content_type"] == "image/png"
+    assert received["data"] == b"x" * 5000
+    assert url.startswith("https://res.cloudinary.com/demo/image/upload/")
+    assert url.endswith("/RestApp/7")
+
+
+def test_filename_and_content_type_cannot_inject_headers():
+    async def scenario():
+        async with CloudinaryStub("secret") as stub:
+            service = avatar_service(stub)
+            try:
+                await service.upload_file(
+                    upload(
+                        b"data",
+                        '../x"\r\nContent-Type: text/html\r\n\r\n.png',
+                        "image/png\r\nX-Injected: 1",
+                    ),
+                    1,
+                )
+            finally:
+                await service.aclose()
+            return stub
+
+    [received] = asyncio.run(scenario()).uploads
+    assert received["data"] == b"data"
+    assert received["content_type"] == "application/octet-stream"
+    assert "\r" not in received["filename"] and '"' not in received["filename"]
+
+
+def test_concurrency_is_limited_and_connections_are_reused():
+    async def scenario():
+        async with CloudinaryStub("secret", delay=0.05) as stub:
+            service = avatar_service(stub, concurrency=2)
+            try:
+                await asyncio.gather(
+                    *(
+                        service.upload_file(upload(b"avatar", f"{n}.png"), n)
+                        for n in range(7)
+                    )
+                )
+            finally:
+                await service.aclose()
+            return stub
+
+    stub = asyncio.run(scenario())
+    assert len(stub.uploads) == 7
+    assert stub.max_active == 2
+    assert stub.connections <= 2
+
+
+def test_rejected_upload_is_a_bad_gateway():
+    async def scenario():
+        async with CloudinaryStub("secret") as stub:
+            service = avatar_service(stub, api_secret="wrong")
+            try:
+                await service.upload_file(upload(b"avatar", "me.png"), 1)
+            finally:
+                await service.aclose()
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(scenario())
+    assert exc_info.value.status_code == 502
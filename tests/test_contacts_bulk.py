@@ -0,0 +1,54 @@
+from src.repository.contacts import ContactRepository
+from src.schemas import ContactBulkSelection, ContactModel
+from src.services.contacts import ContactService
+
+
+def contact(n: int, last_name: str) -> ContactModel:
+    return ContactModel(
+        first_name="Bulk",
+        last_name=last_name,
+        email=f"bulk-{n}@example.com",
+        phone=f"+38050{n:07d}",
+    )
+
+
+def test_filter_wildcards_match_literally(with_user):
+    async def scenario(db, user):
+        await ContactRepository(db).insert_contacts(
+            user,
+            [
+                contact(1, "Shevchenko").model_dump(),
+                contact(2, "Under_score").model_dump(),
+                contact(3, "Percent%").model_dump(),
+            ],
+        )
+        service = ContactService(db)
+        results = []
+        # Unescaped, "Shev%" and "_" would match Shevchenko too.
+        for last_name in ("Shev%", "%", "_"):
+            body = ContactBulkSelection(filter={"last_name": last_name})
+            result = await service.bulk_delete_contacts(user, body)
+            results.append(len(result.affected))
+        remaining = await ContactRepository(db).get_contacts(user, 0, 10)
+        return results, sorted(row.last_name for row in remaining)
+
+    results, remaining = with_user(scenario)
+    assert results == [0, 1, 1]
+    assert remaining == ["Shevchenko"]
+
+
+def test_filter_reports_truncation(with_user, settings):
+    settings.CONTACTS_BULK_MAX_ITEMS = 3
+
+    async def scenario(db, user):
+        await ContactRepository(db).insert_contacts(
+            user, [contact(n, "Truncated").model_dump() for n in range(1, 6)]
+        )
+        service = ContactService(db)
+        body = ContactBulkSelection(filter={"last_name": "Truncated"})
+        return [await service.bulk_delete_contacts(user, body) for _ in range(3)]
+
+    first, second, third = with_user(scenario)
+    assert (len(first.affected), first.truncated) == (3, True)
+    assert (len(second.affected), second.truncated) == (2, False)
+    assert (third.affected, third.truncated) == ([], False)
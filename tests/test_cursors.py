@@ -0,0 +1,66 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from src.services.contacts import decode_cursor, encode_cursor
+
+
+def make_cursor(*payload) -> str:
+    data = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+class Row:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+def test_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30)
+    row = Row(id=7, last_name="Shevchenko", created_at=created_at)
+    assert decode_cursor(encode_cursor("id", False, row), "id", False) == (7, 7)
+    assert decode_cursor(encode_cursor("last_name", True, row), "last_name", True) == (
+        "Shevchenko",
+        7,
+    )
+    assert decode_cursor(
+        encode_cursor("created_at", False, row), "created_at", False
+    ) == (created_at, 7)
+
+
+@pytest.mark.parametrize(
+    "cursor, sort",
+    [
+        ("not base64!", "id"),
+        (make_cursor("id", False, "7", 7), "id"),
+        (make_cursor("id", False, True, 7), "id"),
+        (make_cursor("last_name", False, 5, 7), "last_name"),
+        (make_cursor("created_at", False, 5, 7), "created_at"),
+        (make_cursor("id", False, 7, "7"), "id"),
+        # Outside int4, which the driver rejects.
+        (make_cursor("id", False, 10**20, 7), "id"),
+        (make_cursor("id", False, 7, 10**20), "id"),
+        (make_cursor("id", False, -(2**31) - 1, 7), "id"),
+        (make_cursor("last_name", False, "Shevchenko", 2**31), "last_name"),
+        # created_at has no time zone, so aware values cannot be compared with it.
+        (make_cursor("created_at", False, "2024-05-01T12:30:00+00:00", 7), "created_at"),
+        (make_cursor("created_at", False, "2024-05-01T12:30:00+03:00", 7), "created_at"),
+    ],
+)
+def test_rejects_tampered_cursors(cursor, sort):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor, sort, False)
+
+
+def test_int4_bounds_are_accepted():
+    assert decode_cursor(make_cursor("id", False, 2**31 - 1, 1), "id", False) == (
+        2**31 - 1,
+        1,
+    )
+
+
+def test_rejects_cursor_for_another_sort():
+    with pytest.raises(ValueError, match="does not match"):
+        decode_cursor(make_cursor("id", True, 7, 7), "id", False)
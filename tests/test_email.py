@@ -0,0 +1,59 @@
+import asyncio
+from email.message import EmailMessage
+
+from prometheus_client import REGISTRY
+
+from src.services.email import MailDispatcher
+from tests.stubs.smtp import SMTPStub
+
+
+def message(n: int) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = f"Message {n}"
+    message["From"] = "noreply@example.com"
+    message["To"] = f"user{n}@example.com"
+    message.set_content("Hello")
+    return message
+
+
+def test_queue_depth_gauge_follows_the_queue():
+    async def scenario():
+        dispatcher = MailDispatcher(pool_size=1)
+        release = asyncio.Event()
+        depths = []
+
+        async def send(smtp, message):
+            await release.wait()
+
+        dispatcher._send = send
+        for n in range(3):
+            await dispatcher.enqueue(message(n))
+        depths.append(REGISTRY.get_sample_value("email_queue_depth"))
+        release.set()
+        await dispatcher.queue.join()
+        depths.append(REGISTRY.get_sample_value("email_queue_depth"))
+        await dispatcher.stop()
+        return depths
+
+    assert asyncio.run(scenario()) == [3, 0]
+
+
+def test_workers_reuse_their_connections(settings):
+    settings.SMTP_SSL_TLS = False
+    settings.USE_CREDENTIALS = False
+
+    async def scenario():
+        async with SMTPStub() as stub:
+            settings.SMTP_HOST, settings.SMTP_PORT = stub.host, stub.port
+            dispatcher = MailDispatcher(pool_size=2, batch_size=5)
+            for n in range(20):
+                await dispatcher.enqueue(message(n))
+            await dispatcher.queue.join()
+            await dispatcher.stop()
+            return stub
+
+    stub = asyncio.run(scenario())
+    assert sorted(m["To"] for m in stub.messages) == sorted(
+        f"user{n}@example.com" for n in range(20)
+    )
+    assert stub.connections <= 2
@@ -0,0 +1,67 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from main import create_app
+from src.database.db import sessionmanager
+from src.services import instrumentation
+from src.services.auth import create_access_token
+from src.services.instrumentation import RequestInstrumentationMiddleware
+
+
+def client(**options) -> TestClient:
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(
+        routes=[Route("/api/contacts", ok), Route("/api/auth/signin", ok)]
+    )
+    app.add_middleware(RequestInstrumentationMiddleware, **options)
+    return TestClient(app)
+
+
+def test_server_timing_is_off_by_default():
+    assert "Server-Timing" not in client().get("/api/contacts").headers
+
+
+def test_server_timing_is_never_sent_on_private_paths():
+    test_client = client(server_timing=True, private_paths=("/api/auth/",))
+    assert "Server-Timing" in test_client.get("/api/contacts").headers
+    assert "Server-Timing" not in test_client.get("/api/auth/signin").headers
+
+
+@pytest.fixture
+def stats_client(settings):
+    settings.STATS_ENABLED = True
+    settings.ADMIN_EMAILS = ["admin@example.com"]
+    # Principals come from the token, so no query reaches the database.
+    settings.AUTH_STATELESS_PRINCIPAL = True
+    sessionmanager.init(settings.DB_URL)
+    yield TestClient(create_app(settings))
+    asyncio.run(sessionmanager.close())
+    instrumentation.set_enabled(True)
+
+
+def auth(email: str, user_id: int) -> dict:
+    token = asyncio.run(
+        create_access_token({"sub": email, "uid": user_id}, timedelta(minutes=5))
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_only_admins_toggle_instrumentation(stats_client):
+    url = "/api/stats/instrumentation"
+    body = {"enabled": False}
+    assert stats_client.put(url, json=body).status_code == 401
+    response = stats_client.put(url, json=body, headers=auth("user@example.com", 2))
+    assert response.status_code == 403
+    assert instrumentation.is_enabled()
+
+    response = stats_client.put(url, json=body, headers=auth("admin@example.com", 1))
+    assert response.json() == {"enabled": False}
+    assert not instrumentation.is_enabled()
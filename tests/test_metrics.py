@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from src.services.metrics import MetricsMiddleware
+
+
+def requests_seen(method: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "http_request_duration_seconds_count",
+            {"method": method, "route": "unmatched", "status": "404"},
+        )
+        or 0
+    )
+
+
+def test_non_standard_methods_share_one_label():
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/", ok)])
+    app.add_middleware(MetricsMiddleware)
+    client = TestClient(app)
+    before = requests_seen("other"), requests_seen("GET")
+
+    for method in ("FOO", "BAR", "PROPFIND"):
+        client.request(method, "/missing")
+    client.get("/missing")
+
+    assert requests_seen("other") - before[0] == 3
+    assert requests_seen("GET") - before[1] == 1
+    assert requests_seen("FOO") == 0
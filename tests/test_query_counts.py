@@ -0,0 +1,150 @@
+"""Statements sent by the repository writes, counted with the cursor hooks
+behind the per-request instrumentation (src/services/instrumentation.py).
+
+A write that starts sending more statements, e.g. a SELECT before an UPDATE
+or one INSERT per row, fails here. Needs TEST_DB_URL.
+"""
+
+import math
+import uuid
+from datetime import datetime
+
+from sqlalchemy import delete
+
+from src.database.models import User
+from src.repository.contacts import ContactRepository
+from src.repository.users import UserRepository
+from src.schemas import ContactModel, ContactUpdate, UserCreate
+from src.services.instrumentation import measure
+
+# Rows per INSERT statement when executemany goes through insertmanyvalues.
+INSERT_PAGE_SIZE = 1000
+
+
+def contact(n: int, last_name: str = "Counts") -> ContactModel:
+    return ContactModel(
+        first_name="Query",
+        last_name=last_name,
+        email=f"query-counts-{n}@example.com",
+        phone=f"+38050{n:07d}",
+    )
+
+
+async def counted(write) -> tuple:
+    with measure() as metrics:
+        result = await write
+    return result, metrics.db_count
+
+
+def test_create_user(with_user):
+    async def scenario(db, user):
+        users = UserRepository(db)
+        email = f"query-counts-{uuid.uuid4().hex[:12]}@example.com"
+        created, count = await counted(
+            users.create_user(UserCreate(email=email, password="not-a-real-hash"))
+        )
+        await db.execute(delete(User).where(User.id == created.id))
+        await db.commit()
+        return count
+
+    assert with_user(scenario) == 1
+
+
+def test_user_updates(with_user):
+    async def scenario(db, user):
+        users = UserRepository(db)
+        _, verified = await counted(users.set_email_verified(user))
+        _, avatar = await counted(
+            users.update_user_avatar(user, "https://example.com/avatar.png")
+        )
+        return verified, avatar
+
+    assert with_user(scenario) == (1, 1)
+
+
+def test_create_contact(with_user):
+    async def scenario(db, user):
+        _, count = await counted(ContactRepository(db).create_contact(user, contact(0)))
+        return count
+
+    assert with_user(scenario) == 2
+
+
+def test_insert_contacts_batches_rows(with_user):
+    rows = [contact(n, "Imported").model_dump() for n in range(1, 1501)]
+
+    async def scenario(db, user):
+        contacts = ContactRepository(db)
+        _, inserted = await counted(contacts.insert_contacts(user, rows))
+        _, duplicates = await counted(contacts.insert_contacts(user, rows[:10]))
+        return inserted, duplicates
+
+    assert with_user(scenario) == (math.ceil(len(rows) / INSERT_PAGE_SIZE) + 1, 1)
+
+
+def test_update_contact(with_user):
+    async def scenario(db, user):
+        contacts = ContactRepository(db)
+        created = await contacts.create_contact(user, contact(0))
+        _, updated = await counted(
+            contacts.update_contact(user, created.id, ContactUpdate(first_name="New"))
+        )
+        _, unchanged = await counted(
+            contacts.update_contact(user, created.id, ContactUpdate())
+        )
+        _, stale = await counted(
+            contacts.update_contact(
+                user,
+                created.id,
+                ContactUpdate(first_name="Stale"),
+                versions=[datetime(2000, 1, 1)],
+            )
+        )
+        return updated, unchanged, stale
+
+    assert with_user(scenario) == (1, 1, 1)
+
+
+def test_bulk_update_contacts(with_user):
+    async def scenario(db, user):
+        contacts = ContactRepository(db)
+        created = await contacts.create_contact(user, contact(0))
+        await contacts.insert_contacts(
+            user, [contact(n, "Imported").model_dump() for n in range(1, 21)]
+        )
+        _, by_ids = await counted(
+            contacts.bulk_update_contacts(
+                user, {"additional_info": "bulk"}, ids=[created.id]
+            )
+        )
+        _, by_filter = await counted(
+            contacts.bulk_update_contacts(
+                user,
+                {"additional_info": "bulk"},
+                filter={"last_name": "Imported"},
+                limit=100,
+            )
+        )
+        return by_ids, by_filter
+
+    assert with_user(scenario) == (1, 1)
+
+
+def test_delete_contacts(with_user):
+    async def scenario(db, user):
+        contacts = ContactRepository(db)
+        created = await contacts.create_contact(user, contact(0))
+        await contacts.insert_contacts(
+            user, [contact(n, "Imported").model_dump() for n in range(1, 21)]
+        )
+        _, deleted = await counted(contacts.delete_contact(user, created.id))
+        _, missing = await counted(contacts.delete_contact(user, created.id))
+        _, by_filter = await counted(
+            contacts.bulk_delete_contacts(
+                user, filter={"last_name": "Imported"}, limit=100
+            )
+        )
+        _, nothing = await counted(contacts.bulk_delete_contacts(user, ids=[0]))
+        return deleted, missing, by_filter, nothing
+
+    assert with_user(scenario) == (2, 1, 2, 1)
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from src.conf.config import RateLimit, Settings
+from src.services.rate_limit import RateLimiter, RateLimitUnavailable, RedisBackend
+from tests.stubs.redis import RedisStub
+
+
+def test_rate_limit_settings_are_parsed_once(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_SIGNIN", "20/hours")
+    monkeypatch.setenv("RATE_LIMIT_ME", "")
+    settings = Settings()
+    assert settings.RATE_LIMIT_SIGNIN == RateLimit(20, 3600)
+    assert settings.RATE_LIMIT_SIGNUP == RateLimit(5, 60)
+    assert settings.RATE_LIMIT_ME is None
+
+
+@pytest.mark.parametrize("value", ["5", "five/minute", "5/fortnight", "-1/minute"])
+def test_malformed_rate_limit_fails_at_startup(monkeypatch, value):
+    monkeypatch.setenv("RATE_LIMIT_SIGNUP", value)
+    with pytest.raises(ValidationError, match="RATE_LIMIT_SIGNUP"):
+        Settings()
+
+
+def test_redis_backend_counts_per_window():
+    async def scenario():
+        async with RedisStub() as stub:
+            limiter = RateLimiter(RedisBackend(f"redis://{stub.host}:{stub.port}/0"))
+            rate = RateLimit(2, 60)
+            try:
+                results = [await limiter.hit("signin:ip", rate, now=600) for _ in range(3)]
+                # Half of the previous window still counts.
+                results.append(await limiter.hit("signin:ip", rate, now=690))
+            finally:
+                await limiter.close()
+            return results, stub.connections
+
+    results, connections = asyncio.run(scenario())
+    assert [result.allowed for result in results] == [True, True, False, False]
+    assert results[2].retry_after == 100
+    assert connections == 1
+
+
+def test_redis_backend_unavailable():
+    async def scenario():
+        async with RedisStub() as stub:
+            url = f"redis://{stub.host}:{stub.port}/0"
+        backend = RedisBackend(url, timeout=0.5)
+        try:
+            await backend.hit("signin:ip", 60, 10)
+        finally:
+            await backend.close()
+
+    with pytest.raises(RateLimitUnavailable):
+        asyncio.run(scenario())